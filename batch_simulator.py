@@ -0,0 +1,302 @@
+# 批量模拟器：以 NumPy 数组同步推进 K 局无界面游戏
+import random
+import time
+
+import numpy as np
+
+import constants as c
+from map import GridMap, MOVES
+from simulation import StalemateDetector, zobrist_table
+
+# 批量引擎可精确复现的警察算法（BFS 的队列顺序可以按层向量化重放）
+BATCH_ALGORITHMS = ("BFS",)
+
+SPRINT_DISTANCE = 3  # 与 find_cooperative_target 的冲刺判定距离一致
+
+REASON_CAPTURE = "警察 {} 完成抓捕"
+REASON_TRAPPED = "小偷无处可逃"
+REASON_STALEMATE = "进入循环僵局"
+REASON_UNREACHABLE = "警察无法到达小偷"
+
+
+# ================== 向量化搜索内核 ==================
+def _first_occurrence(keys, scratch):
+    """
+    返回 keys 中每个值首次出现的位置（保持原顺序），用于同层去重。
+    倒序写入 scratch 使首次出现的位置最后写入，避免排序。
+    """
+    order = np.arange(len(keys))
+    scratch[keys[::-1]] = order[::-1]
+    return order[scratch[keys] == order]
+
+
+def _distance_fields(nbr, search_game, sources):
+    """
+    多源并行 BFS：第 s 个搜索在地图 search_game[s] 上以 sources[s] 为源点。
+    返回 dist[S, n]，-1 表示不可达（只考虑障碍物，与 GridMap.distance 一致）。
+    """
+    num_searches = len(sources)
+    n = nbr.shape[1]
+    dist = np.full((num_searches, n), -1, dtype=np.int32)
+    if num_searches == 0:
+        return dist
+
+    search_ids = np.arange(num_searches)
+    dist[search_ids, sources] = 0
+    flat = dist.ravel()
+    scratch = np.empty(num_searches * n, dtype=np.int64)
+    frontier_s, frontier_c = search_ids, np.asarray(sources)
+    level = 0
+    while len(frontier_s):
+        level += 1
+        cand = nbr[search_game[frontier_s], frontier_c].ravel()
+        owner = np.repeat(frontier_s, nbr.shape[2])
+        ok = cand >= 0
+        keys = owner[ok] * n + cand[ok]
+        keys = keys[flat[keys] < 0]
+        keys = keys[_first_occurrence(keys, scratch)]
+        flat[keys] = level
+        frontier_s, frontier_c = np.divmod(keys, n)
+    return dist
+
+
+def _bfs_first_steps(nbr, games, starts, goals, occupied):
+    """
+    向量化重放 bfs_next_step：逐层扩展并保持 FIFO 发现顺序，使每个格子的父节点与标量 BFS 相同。
+    每个格子携带“起点后第一步”的标签，目标被发现时其标签即为下一步。
+    :param games: 每个搜索所在的地图编号
+    :param occupied: bool[K, n]，被其他警察占用的格子（目标格不豁免，与标量 BFS 一致）
+    :return: 每个搜索的下一步格子下标，不可达时原地不动
+    """
+    num_searches = len(starts)
+    n = nbr.shape[1]
+    result = starts.copy()
+    if num_searches == 0:
+        return result
+
+    visited = occupied[games]
+    search_ids = np.arange(num_searches)
+    visited[search_ids, starts] = True
+    visited_flat = visited.ravel()
+    scratch = np.empty(num_searches * n, dtype=np.int64)
+
+    # 起点即目标时直接返回起点
+    pending = starts != goals
+    frontier_s = search_ids[pending]
+    frontier_c = starts[pending]
+    frontier_label = np.full(len(frontier_s), -1, dtype=np.int64)
+
+    while len(frontier_s):
+        width = nbr.shape[2]
+        cand = nbr[games[frontier_s], frontier_c].ravel()
+        owner = np.repeat(frontier_s, width)
+        label = np.repeat(frontier_label, width)
+
+        ok = cand >= 0
+        ok[ok] = ~visited_flat[owner[ok] * n + cand[ok]]
+        owner, cand, label = owner[ok], cand[ok], label[ok]
+
+        # 同一层中同一格子只保留第一次被发现的记录（即标量 BFS 中的父节点）
+        keys = owner * n + cand
+        first = _first_occurrence(keys, scratch)
+        owner, cand, keys = owner[first], cand[first], keys[first]
+        label = np.where(label[first] < 0, cand, label[first])
+        visited_flat[keys] = True
+
+        # 目标被发现的搜索记录结果并停止扩展
+        found = cand == goals[owner]
+        result[owner[found]] = label[found]
+        keep = ~np.isin(owner, owner[found])
+        frontier_s, frontier_c, frontier_label = owner[keep], cand[keep], label[keep]
+    return result
+
+
+# ================== 批量模拟器 ==================
+class BatchSimulator:
+    def __init__(self, seeds, police_count, obstacle_density, algorithm="BFS",
+                 size=c.GRID_SIZE, max_turns=None, connected=False, maps=None):
+        """
+        以同样的种子生成 K 张地图，并把全部状态堆叠为 NumPy 数组同步推进。
+        每个种子 s 的结果与 random.seed(s) 后运行标量 Game 的回合数、步数完全一致。
+        :param seeds: 每局游戏的随机种子
+        :param police_count: 每局警察数量
+        :param obstacle_density: 障碍物密度
+        :param algorithm: 警察算法，必须属于 BATCH_ALGORITHMS
+        :param max_turns: 回合上限，None 表示不限
+        :param connected: 是否保证小偷与警察出生在同一连通分量
+        :param maps: 预先构建的地图列表（例如来自地图语料库），给出时不再按种子生成
+        """
+        if algorithm not in BATCH_ALGORITHMS:
+            raise ValueError(f"批量模拟器不支持算法 {algorithm}，可选: {BATCH_ALGORITHMS}")
+
+        self.size = size
+        self.police_count = police_count
+        self.algorithm = algorithm
+        self.max_turns = max_turns
+        num_games = len(seeds)
+        n = size * size
+
+        # 1. 逐局生成地图（与标量 Game.start_game 的随机序列一致），再堆叠为数组
+        self.grids = np.empty((num_games, size, size), dtype=np.uint8)
+        self.nbr = np.full((num_games, n, len(MOVES)), -1, dtype=np.int32)
+        self.thief = np.empty(num_games, dtype=np.int64)
+        self.police = np.empty((num_games, police_count), dtype=np.int64)
+        reachable = np.ones(num_games, dtype=bool)
+        for g, seed in enumerate(seeds):
+            if maps is not None:
+                game_map = maps[g]
+            else:
+                random.seed(seed)
+                game_map = GridMap(size, police_count, obstacle_density, connected)
+            reachable[g] = game_map.thief_reachable()
+            self.grids[g] = game_map.grid
+            indptr, indices = game_map.adj_indptr, game_map.adj_indices
+            # CSR 行内保持 MOVES 顺序，按行内偏移展开为定长表
+            rows = np.repeat(np.arange(n), np.diff(indptr))
+            slots = np.arange(len(indices)) - indptr[rows]
+            self.nbr[g, rows, slots] = indices
+            self.thief[g] = game_map.thief_pos[0] * size + game_map.thief_pos[1]
+            self.police[g] = [r * size + col for _, (r, col) in game_map.police_positions]
+
+        # 2. 状态标志
+        self.running = reachable.copy()  # 没有警察与小偷连通的对局开局即结束
+        self.turns = np.zeros(num_games, dtype=np.int64)
+        self.steps = np.zeros(num_games, dtype=np.int64)
+        self.reasons = ["" if ok else REASON_UNREACHABLE for ok in reachable.tolist()]
+        self.search_time = np.zeros(num_games)  # 警察阶段耗时按当回合仍在进行的对局均摊（秒）
+
+        # 3. 僵局检测：与 Simulation 共用 Zobrist 键与检测窗口，每局一个检测器
+        thief_keys, police_keys = zobrist_table(size)
+        self.thief_keys = np.array(thief_keys, dtype=np.uint64)
+        self.police_keys = np.array(police_keys, dtype=np.uint64)
+        self.stalemate = [StalemateDetector(c.STALEMATE_HISTORY_SIZE) for _ in range(num_games)]
+
+    # ================== 协作目标 ==================
+    def _cooperative_targets(self, games):
+        """向量化的 find_cooperative_target，返回 targets[len(games), police_count]"""
+        size = self.size
+        thief = self.thief[games]
+        police = self.police[games]
+        tr, tc = np.divmod(thief, size)
+        pr, pc = np.divmod(police, size)
+        manhattan = np.abs(pr - tr[:, None]) + np.abs(pc - tc[:, None])
+
+        targets = np.repeat(thief[:, None], self.police_count, axis=1)
+        chase = self.nbr[games, thief]  # 小偷四周可通行格子，保持方向顺序
+        chase_ok = chase >= 0
+        surround = ~(manhattan <= SPRINT_DISTANCE).any(axis=1) & chase_ok.any(axis=1)
+        if not surround.any():
+            return targets
+
+        # 每个围堵格子一次 BFS，得到所有警察到各围堵格子的真实距离
+        rows = np.flatnonzero(surround)
+        src_row, src_slot = np.nonzero(chase_ok[rows])
+        fields = _distance_fields(self.nbr, games[rows][src_row], chase[rows][src_row, src_slot])
+        dist = np.full((len(rows), len(MOVES), self.police_count), -1, dtype=np.int64)
+        dist[src_row, src_slot] = fields[np.arange(len(src_row))[:, None], police[rows][src_row]]
+
+        # 按曼哈顿距离稳定排序，依次领取最近的剩余围堵格
+        order = np.argsort(manhattan[rows], axis=1, kind="stable")
+        remaining = chase_ok[rows].copy()
+        local = np.arange(len(rows))
+        for j in range(self.police_count):
+            officer = order[:, j]
+            d = dist[local, :, officer]
+            d = np.where(remaining & (d >= 0), d, np.iinfo(np.int64).max)
+            best = np.argmin(d, axis=1)
+            has = d[local, best] != np.iinfo(np.int64).max
+            targets[rows[has], officer[has]] = chase[rows][has, best[has]]
+            remaining[local[has], best[has]] = False
+        return targets
+
+    # ================== 回合推进 ==================
+    def _police_phase(self):
+        games = np.flatnonzero(self.running)
+        targets = self._cooperative_targets(games)
+        occupied = np.zeros((len(self.running), self.size * self.size), dtype=bool)
+        occupied[games[:, None], self.police[games]] = True
+
+        # 警察按编号依次移动，占用表随之更新；抓捕后该局的后续警察不再移动
+        active = np.ones(len(games), dtype=bool)
+        for pid in range(self.police_count):
+            idx = np.flatnonzero(active)
+            g = games[idx]
+            cur = self.police[g, pid]
+            occupied[g, cur] = False
+            nxt = _bfs_first_steps(self.nbr, g, cur, targets[idx, pid], occupied)
+            occupied[g, nxt] = True
+            self.police[g, pid] = nxt
+            self.steps[g] += nxt != cur
+
+            caught = nxt == self.thief[g]
+            for game in g[caught]:
+                self.reasons[game] = REASON_CAPTURE.format(pid)
+            self.running[g[caught]] = False
+            active[idx[caught]] = False
+
+    def _thief_phase(self):
+        games = np.flatnonzero(self.running)
+        if not len(games):
+            return
+        size = self.size
+        thief = self.thief[games]
+        police = self.police[games]
+
+        # 候选：四个方向的邻居 + 原地，排除警察所在格；按 move_thief 的顺序取第一个最大值
+        cand = np.concatenate([self.nbr[games, thief], thief[:, None]], axis=1)
+        valid = (cand >= 0) & ~(cand[:, :, None] == police[:, None, :]).any(axis=2)
+        cr, cc = np.divmod(cand, size)
+        pr, pc = np.divmod(police, size)
+        score = (np.abs(cr[:, :, None] - pr[:, None, :]) + np.abs(cc[:, :, None] - pc[:, None, :])).min(axis=2)
+        score = np.where(valid, score, -1)
+        best = np.argmax(score, axis=1)
+        has = score[np.arange(len(games)), best] >= 0
+        self.thief[games] = np.where(has, cand[np.arange(len(games)), best], thief)
+
+        trapped = (self.police[games] == self.thief[games][:, None]).any(axis=1)
+        for game in games[trapped]:
+            self.reasons[game] = REASON_TRAPPED
+        self.running[games[trapped]] = False
+
+        games = games[~trapped]
+        self.turns[games] += 1
+        self._check_stalemate(games)
+
+    def _check_stalemate(self, games):
+        hashes = self.thief_keys[self.thief[games]] ^ np.bitwise_xor.reduce(self.police_keys[self.police[games]], axis=1)
+        for game, state_hash in zip(games.tolist(), hashes.tolist()):
+            if self.stalemate[game].check(state_hash):
+                self.reasons[game] = REASON_STALEMATE
+                self.running[game] = False
+
+    def step(self):
+        """推进一个完整回合（全部警察 + 小偷），已结束的对局被屏蔽"""
+        games = np.flatnonzero(self.running)
+        start_time = time.perf_counter()
+        self._police_phase()
+        self.search_time[games] += (time.perf_counter() - start_time) / len(games)
+        self._thief_phase()
+        if self.max_turns is not None:
+            self.running &= self.turns < self.max_turns
+
+    def run(self):
+        """运行直到所有对局结束或达到回合上限，返回 (turns, steps, reasons)"""
+        while self.running.any():
+            self.step()
+        return self.turns, self.steps, self.reasons
+
+
+def run_batch(seeds, police_count, obstacle_density, algorithm="BFS", max_turns=None, batch_size=2048,
+              size=c.GRID_SIZE, connected=False, maps=None):
+    """分块运行任意数量的对局，控制堆叠数组的内存占用，返回 (turns, steps, reasons, search_times)"""
+    turns, steps, reasons, search_times = [], [], [], []
+    for i in range(0, len(seeds), batch_size):
+        sim = BatchSimulator(seeds[i:i + batch_size], police_count, obstacle_density,
+                             algorithm=algorithm, size=size, max_turns=max_turns, connected=connected,
+                             maps=None if maps is None else maps[i:i + batch_size])
+        t, s, r = sim.run()
+        turns.extend(t.tolist())
+        steps.extend(s.tolist())
+        reasons.extend(r)
+        search_times.extend(sim.search_time.tolist())
+    return turns, steps, reasons, search_times
@@ -1,8 +1,52 @@
 # 全局配置
 
-# 地图大小
+# 地图大小（默认值，可通过 python main.py --size N 修改；与窗口大小无关）
 GRID_SIZE = 20
 
+# 地图格子编码（GridMap.grid 为 uint8 数组）
+CELL_EMPTY = 0     # 空地
+CELL_OBSTACLE = 1  # 障碍物
+CELL_POLICE = 2    # 警察出生点
+CELL_THIEF = 3     # 小偷出生点
+
+# 僵局检测记住的最近状态数（None 表示不限窗口：任何重复局面都判为僵局）
+STALEMATE_HISTORY_SIZE = None
+ZOBRIST_SEED = 0x5EED  # 状态哈希键的固定种子
+
+# 每张地图最多缓存的 BFS 距离场数量（LRU 淘汰）
+DISTANCE_CACHE_SIZE = 64
+
+# 每张地图最多保留的增量规划器（每名警察一个）搜索状态数量（LRU 淘汰）
+PLANNER_CACHE_SIZE = 256
+
+# 分层寻路（HPA*）：簇边长、入口拆分长度（不短于该长度的入口在两端各放一对过渡格）、路线缓存数量
+CLUSTER_SIZE = 16
+ENTRANCE_SPLIT_LENGTH = 6
+ROUTE_CACHE_SIZE = 256
+# 边长不小于该值的地图，GridMap.distance 改用分层路线长度，避免整图 BFS 距离场
+HPA_MIN_MAP_SIZE = 100
+
+# WHCA* 时空预约表的规划窗口（步）
+WHCA_WINDOW = 8
+
+# 小偷博弈搜索：迭代加深的最大深度（小偷回合数）、GUI 中每步的时间预算（秒）、置换表容量、被抓的估值
+THIEF_SEARCH_DEPTH = 3
+THIEF_TIME_BUDGET = 0.05
+THIEF_TABLE_SIZE = 200000
+THIEF_CAPTURE_SCORE = 10 ** 6
+
+# 逆向分析求解器：联合状态数上限（超出时不求解）、每批展开的局面数、结果表目录
+RETRO_MAX_STATES = 50_000_000
+RETRO_CHUNK_SIZE = 1 << 16
+RETRO_CACHE_DIR = "retro_tables"
+
+# 对局轨迹：关键帧间隔（回合，回放跳转时最多从关键帧重放这么多回合）、回放中 [ / ] 每次跳过的回合数
+TRACE_KEYFRAME_INTERVAL = 64
+REPLAY_SEEK_STEP = 10
+
+# 界面模式下后台模拟线程最多提前计算的子步骤数（快照队列容量）
+SNAPSHOT_QUEUE_SIZE = 120
+
 # 警察数量选项
 INITIAL_POLICE_COUNT = 3
 MIN_POLICE = 1
@@ -15,6 +59,8 @@ DEFAULT_DENSITY_INDEX = 1  # 默认中 0.15
 # FPS 设置选项
 FPS_OPTIONS = [2, 5, 10, 15, 20, 30]
 DEFAULT_FPS_INDEX = 2  # 默认 10 FPS
+# 极速模式（FPS 调到最大值之后，或对局中按 T）：每帧在该时间预算（毫秒）内推进尽可能多的子步骤
+TURBO_FRAME_BUDGET = 12
 
 # UI 布局
 TILE_SIZE = 30
@@ -23,9 +69,16 @@ CAPTION = "警察抓小偷"
 TOP_BAR_HEIGHT = 60
 BOTTOM_BAR_HEIGHT = 80
 
+# 地图视口：窗口只显示 VIEW_TILES x VIEW_TILES 个默认大小的格子，更大的地图通过滚动/缩放查看
+VIEW_TILES = 20
+ZOOM_LEVELS = [4, 6, 10, 15, 20, 30, 45]  # 可选的格子像素大小，默认使用 TILE_SIZE
+SCROLL_STEP = 1  # 方向键每次滚动的格数
+MINIMAP_SIZE = 120  # 小地图边长（像素），地图超出视口时显示
+
 MAP_OFFSET_Y = TOP_BAR_HEIGHT
-SCREEN_HEIGHT = TOP_BAR_HEIGHT + GRID_SIZE * TILE_SIZE + BOTTOM_BAR_HEIGHT
-SCREEN_WIDTH = GRID_SIZE * TILE_SIZE
+MAP_VIEW_HEIGHT = VIEW_TILES * TILE_SIZE
+SCREEN_HEIGHT = TOP_BAR_HEIGHT + MAP_VIEW_HEIGHT + BOTTOM_BAR_HEIGHT
+SCREEN_WIDTH = VIEW_TILES * TILE_SIZE
 
 # 游戏状态
 GAME_STATES = {"MENU": 0, "RUNNING": 1, "GAME_OVER": 2}
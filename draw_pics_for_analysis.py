@@ -15,9 +15,12 @@ os.makedirs(output_dir, exist_ok=True)
 df = pd.read_csv('output/experiment_summary.csv')
 if df['stalemate_rate'].dtype == 'O':
     df['stalemate_rate'] = df['stalemate_rate'].str.rstrip('%').astype('float')
+# 多种分配方式并存时只绘制默认的贪心分配，避免不同模式的数据混在同一条曲线里
+if 'assignment' in df.columns and df['assignment'].nunique() > 1:
+    df = df[df['assignment'] == 'greedy']
 
 # 定义算法颜色
-color_map = {'A*': '#e74c3c', 'BFS': '#2ecc71', 'DFS': '#9b59b6', 'Greedy': '#f1c40f'}
+color_map = {'A*': '#e74c3c', 'BFS': '#2ecc71', 'DFS': '#9b59b6', 'Greedy': '#f1c40f', 'FlowField': '#3498db', 'D*Lite': '#e67e22', 'JPS': '#1abc9c', 'HPA*': '#34495e', 'WHCA*': '#d35400'}
 
 
 # ================== 3. 核心绘图逻辑 ==================
@@ -1,96 +1,534 @@
+import argparse
+import hashlib
+import json
+import math
 import os
+import random
 import pandas as pd
 import sys  # <--- 必须导入 sys 模块
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
-from main import Game
+from simulation import Simulation
 import constants as c
-from utils import POLICE_ALGORITHMS
+from utils import ASSIGNMENT_MODES, POLICE_ALGORITHMS, TEAM_ALGORITHMS, THIEF_ALGORITHMS
+from batch_simulator import BATCH_ALGORITHMS, run_batch
+from map_corpus import MapCorpus, build_corpus, corpus_path
+from retrograde import CaptureTable
 
 # ================== 实验配置 ==================
 POLICE_COUNTS = list(range(2, 8))
 DENSITIES = [0.05, 0.15, 0.25]
-ALGORITHMS = list(POLICE_ALGORITHMS.keys())
+ALGORITHMS = list(POLICE_ALGORITHMS.keys()) + list(TEAM_ALGORITHMS.keys())
+ASSIGNMENTS = ["greedy"]  # 围堵格分配方式，见 ASSIGNMENT_MODES；可用 --assignment greedy,hungarian 对比
 
 TRIALS_PER_GROUP = 20
 MAX_TURNS_SAFETY = 1000
+USE_BATCH_ENGINE = True  # 支持的算法整组交给批量模拟器同步运行
+BASE_SEED = 20240601     # 每轮种子由该基准种子与分组参数派生
+CHUNK_SIZE = 10          # 并行模式下每个任务块包含的轮次数
+MAP_SIZE = c.GRID_SIZE   # 地图边长，可用 --size 覆盖；不小于 HPA_MIN_MAP_SIZE 时距离查询改走 HPA* 抽象图
+THIEF_ALGORITHM = next(iter(THIEF_ALGORITHMS))  # 小偷算法，可用 --thief 覆盖；实验中不设时间预算，结果可复现
+SOLVE_OPTIMAL = False    # 用逆向分析求每轮初始局面的最优抓捕回合数并统计差距（--optimal），只适用于小地图
+CONNECTED_MAPS = False   # 保证小偷与警察出生在同一连通分量（--connected）
+MAP_CORPUS = None        # 地图语料库目录（--corpus）：各算法与各进程按轮次读取同一批地图，None 表示按种子现场生成
+TRACE_DIR = None         # 对局轨迹目录（--traces）：每轮写入一个轨迹文件，可用 main.py --replay 回放
+
+STALEMATE_REASON = "进入循环僵局"
+UNREACHABLE_REASON = "警察无法到达小偷"
 
 OUTPUT_DIR = "output"
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
 
-def run_experiment():
-    all_results = []
-    total_groups = len(POLICE_COUNTS) * len(DENSITIES) * len(ALGORITHMS)
+def trial_seed(count, density, algo, trial_id):
+    """由 (警察数, 密度, 算法, 轮次) 派生固定种子，串行与并行运行结果逐位一致"""
+    key = f"{BASE_SEED}|{count}|{density}|{algo}|{trial_id}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+_simulation = None  # 每个进程复用同一个 Simulation 实例
+_corpora = {}       # 每个进程已映射的语料库：{(警察数, 密度): MapCorpus}
+
 
-    print(f"开始自动化实验任务...")
-    pbar_total = tqdm(total=total_groups, desc="总进度", position=0, leave=True, file=sys.stdout, dynamic_ncols=True)
+def set_map_size(size):
+    """设置地图边长"""
+    global MAP_SIZE
+    MAP_SIZE = size
 
+
+def init_worker(size, thief_algorithm, solve_optimal=False, connected=False, corpus=None, traces=None,
+                output=OUTPUT_DIR):
+    """并行模式下的子进程初始化函数，保证各进程使用同一地图尺寸、小偷算法、最优解、连通性、语料库、轨迹设置与运行目录"""
+    global THIEF_ALGORITHM, SOLVE_OPTIMAL, CONNECTED_MAPS, MAP_CORPUS, TRACE_DIR, OUTPUT_DIR
+    set_map_size(size)
+    THIEF_ALGORITHM = thief_algorithm
+    SOLVE_OPTIMAL = solve_optimal
+    CONNECTED_MAPS = connected
+    MAP_CORPUS = corpus
+    TRACE_DIR = traces
+    OUTPUT_DIR = output
+
+
+def prepare_corpus():
+    """为每组 (警察数, 密度) 准备 TRIALS_PER_GROUP 张地图的语料库文件，参数一致的已有文件直接复用"""
     for count in POLICE_COUNTS:
         for density in DENSITIES:
-            for algo in ALGORITHMS:
-                group_desc = f"P={count}|D={density:.2f}|{algo}"
-                group_data = []
+            path = corpus_path(MAP_CORPUS, count, density)
+            if os.path.exists(path):
+                try:
+                    corpus = MapCorpus(path)
+                except ValueError:
+                    corpus = None
+                if (corpus is not None and corpus.size == MAP_SIZE and corpus.connected == CONNECTED_MAPS
+                        and len(corpus) >= TRIALS_PER_GROUP):
+                    continue
+            build_corpus(path, TRIALS_PER_GROUP, MAP_SIZE, count, density, seed=BASE_SEED, connected=CONNECTED_MAPS)
 
-                for trial in range(TRIALS_PER_GROUP):
-                    pbar_total.set_postfix_str(f"当前: {group_desc} | 轮次: {trial + 1}/{TRIALS_PER_GROUP}")
 
-                    game = Game(c.GRID_SIZE, count, headless=True)
-                    game.start_game(algo_override=algo, density_override=density, count_override=count)
+def corpus_map(count, density, trial_id):
+    """使用地图语料库时返回第 trial_id 轮的地图（每次重新解码），否则返回 None"""
+    if not MAP_CORPUS:
+        return None
+    corpus = _corpora.get((count, density))
+    if corpus is None:
+        corpus = MapCorpus(corpus_path(MAP_CORPUS, count, density))
+        _corpora[(count, density)] = corpus
+    return corpus.load(trial_id - 1)
 
-                    while game.state == c.GAME_STATES["RUNNING"] and game.turn < MAX_TURNS_SAFETY:
-                        game.handle_turn()
 
-                    reason = game.game_over_reason if game.turn < MAX_TURNS_SAFETY else "Timeout"
-                    res = {
-                        "police_count": count, "density": density, "algorithm": algo,
-                        "trial_id": trial + 1, "total_turns": game.turn,
-                        "total_steps": game.total_steps, "game_over_reason": reason
-                    }
-                    all_results.append(res)
-                    group_data.append(res)
+def trace_path(count, density, algo, assignment, trial_id):
+    """每轮对局的轨迹文件路径"""
+    suffix = "" if assignment == "greedy" else f"_{assignment}"
+    return os.path.join(TRACE_DIR, f"P{count}_D{density}_{algo.replace('*', 'Star')}{suffix}_{trial_id}.trace")
 
-                # 保存每组详情（在内层循环结束后）
-                group_df = pd.DataFrame(group_data)
-                safe_algo_name = algo.replace("*", "Star")
-                filename = f"detail_P{count}_D{density}_{safe_algo_name}.csv"
-                group_df.to_csv(os.path.join(OUTPUT_DIR, filename), index=False)
 
-                pbar_total.update(1)
+def run_trial(count, density, algo, seed, assignment="greedy", game_map=None, trace=None):
+    """
+    用无界面 Simulation 运行一轮，返回 (total_turns, total_steps, game_over_reason, search_time)
+    :param game_map: 语料库中的地图，None 表示按种子生成
+    :param trace: 轨迹文件路径，None 表示不记录
+    """
+    global _simulation
+    if _simulation is None or _simulation.size != MAP_SIZE:
+        _simulation = Simulation(MAP_SIZE)
 
-    # =======================================================
-    # 注意：以下逻辑必须与上面的 for count in POLICE_COUNTS: 对齐
-    # 这样它才会在所有循环彻底结束后仅运行一次
-    # =======================================================
-    pbar_total.close()
-    print("\n\n所有实验逻辑运行完毕，正在生成汇总报表...")
+    sim = _simulation
+    sim.connected = CONNECTED_MAPS
+    sim.record = trace is not None
+    sim.reset(seed, police_algorithm=algo, obstacle_density=density, police_count=count, assignment=assignment,
+              thief_algorithm=THIEF_ALGORITHM, game_map=game_map)
+    sim.run(MAX_TURNS_SAFETY)
+
+    reason = sim.game_over_reason if sim.turn < MAX_TURNS_SAFETY else "Timeout"
+    if trace is not None:
+        sim.save_trace(trace, reason)
+    return sim.turn, sim.total_steps, reason, sim.search_time
 
-    full_df = pd.DataFrame(all_results)
-    full_df.to_csv(os.path.join(OUTPUT_DIR, "all_trials_raw.csv"), index=False)
 
-    # 计算僵局率的辅助函数
-    def calculate_stalemate_rate(reasons):
-        stalemate_count = (reasons == "进入循环僵局").sum()
-        return stalemate_count / len(reasons)
+def optimal_capture_turns(count, density, seed, game_map=None):
+    """
+    查询该轮初始地图在逆向分析结果表中的最优抓捕回合数（未给出 game_map 时按种子重建地图）。
+    小偷能无限期逃脱时返回 -1，状态数超过 RETRO_MAX_STATES 无法求解时返回 None。
+    """
+    if game_map is None:
+        sim = Simulation(MAP_SIZE, connected=CONNECTED_MAPS)
+        sim.reset(seed, obstacle_density=density, police_count=count)
+        game_map = sim.map_data
+    try:
+        table = CaptureTable(game_map, count, cache_dir=os.path.join(OUTPUT_DIR, c.RETRO_CACHE_DIR))
+    except ValueError:
+        return None
+    turns = table.capture_turns(game_map.thief_pos, game_map.police_positions)
+    return -1 if turns is None else turns
 
-    summary = full_df.groupby(["police_count", "density", "algorithm"]).agg({
-        "total_turns": ["mean", "std"],
-        "total_steps": ["mean", "std"],
-        "game_over_reason": [calculate_stalemate_rate]
-    }).reset_index()
 
-    summary.columns = [
-        "police_count", "density", "algorithm",
-        "avg_turns", "std_turns", "avg_steps", "std_steps",
-        "stalemate_rate"
+def run_chunk(task):
+    """
+    运行一个任务块（同一组内连续的若干轮次），可在子进程中执行。
+    :param task: (count, density, algo, assignment, trial_ids)
+    :return: [(trial_id, total_turns, total_steps, game_over_reason, search_time, optimal_turns), ...]，
+             未开启 SOLVE_OPTIMAL 时 optimal_turns 为 None
+    """
+    count, density, algo, assignment, trial_ids = task
+    # 种子与分配方式无关：不同分配方式在相同地图上对比
+    seeds = [trial_seed(count, density, algo, trial_id) for trial_id in trial_ids]
+    # 使用语料库时同一轮次的地图对所有算法相同
+    maps = [corpus_map(count, density, trial_id) for trial_id in trial_ids]
+
+    if use_batch_engine(algo, assignment):
+        # 支持的算法整块交给批量模拟器同步运行，结果与逐轮运行一致
+        turns, steps, reasons, search_times = run_batch(seeds, count, density, algorithm=algo,
+                                                        max_turns=MAX_TURNS_SAFETY, size=MAP_SIZE,
+                                                        connected=CONNECTED_MAPS,
+                                                        maps=maps if MAP_CORPUS else None)
+        outcomes = [
+            (turn, total_steps, reason if turn < MAX_TURNS_SAFETY else "Timeout", search_time)
+            for turn, total_steps, reason, search_time in zip(turns, steps, reasons, search_times)
+        ]
+    else:
+        traces = [trace_path(count, density, algo, assignment, trial_id) if TRACE_DIR else None
+                  for trial_id in trial_ids]
+        outcomes = [run_trial(count, density, algo, seed, assignment, game_map, trace)
+                    for seed, game_map, trace in zip(seeds, maps, traces)]
+
+    optimal = [
+        optimal_capture_turns(count, density, seed, corpus_map(count, density, trial_id)) if SOLVE_OPTIMAL else None
+        for seed, trial_id in zip(seeds, trial_ids)
     ]
+    return [(trial_id, *outcome, best) for trial_id, outcome, best in zip(trial_ids, outcomes, optimal)]
+
+
+def use_batch_engine(algo, assignment="greedy"):
+    """
+    批量模拟器只实现贪心分配与曼哈顿距离的小偷，且每回合计算整图距离场，
+    只用于未启用分层寻路的地图尺寸；记录轨迹时逐轮运行
+    """
+    return (USE_BATCH_ENGINE and not TRACE_DIR and algo in BATCH_ALGORITHMS and assignment == "greedy"
+            and THIEF_ALGORITHM == next(iter(THIEF_ALGORITHMS)) and MAP_SIZE < c.HPA_MIN_MAP_SIZE)
+
+
+def make_tasks(chunk_size=None):
+    """按 POLICE_COUNTS × DENSITIES × ALGORITHMS × ASSIGNMENTS 的顺序把每组轮次切成任务块"""
+    chunk_size = chunk_size or CHUNK_SIZE
+    tasks = []
+    for count in POLICE_COUNTS:
+        for density in DENSITIES:
+            for algo in ALGORITHMS:
+                for assignment in ASSIGNMENTS:
+                    for start in range(1, TRIALS_PER_GROUP + 1, chunk_size):
+                        trial_ids = list(range(start, min(start + chunk_size, TRIALS_PER_GROUP + 1)))
+                        tasks.append((count, density, algo, assignment, trial_ids))
+    return tasks
+
+
+# --- RunningStats 类 ---
+class RunningStats:
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        """Welford 在线均值/方差：样本逐个加入，只保存计数、均值与离差平方和"""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def average(self):
+        return self.mean if self.count else math.nan
+
+    def std(self):
+        """样本标准差（ddof=1，与 pandas 一致），少于 2 个样本时为 NaN"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+# --- GroupStats 类 ---
+class GroupStats:
+    __slots__ = ("trials", "captures", "stalemates", "unreachable", "turns", "steps", "search_ms",
+                 "solved", "guaranteed", "optimal_turns", "gap")
+
+    def __init__(self):
+        """一组 (警察数, 密度, 算法, 分配方式) 的汇总统计，逐轮累加，内存与轮次数无关"""
+        self.trials = 0
+        self.captures = 0
+        self.stalemates = 0
+        self.unreachable = 0
+        self.turns = RunningStats()
+        self.steps = RunningStats()
+        self.search_ms = RunningStats()
+        self.solved = 0       # 逆向分析求解过的轮次
+        self.guaranteed = 0   # 其中最优策略保证抓捕的轮次
+        self.optimal_turns = RunningStats()
+        self.gap = RunningStats()
+
+    def add(self, res):
+        """加入一轮的结果（run_experiment 中的 res 字典）"""
+        self.trials += 1
+        self.captures += res["game_over_reason"] not in (STALEMATE_REASON, UNREACHABLE_REASON, "Timeout")
+        self.stalemates += res["game_over_reason"] == STALEMATE_REASON
+        self.unreachable += res["game_over_reason"] == UNREACHABLE_REASON
+        self.turns.add(res["total_turns"])
+        self.steps.add(res["total_steps"])
+        self.search_ms.add(res["search_ms"])
+        if res.get("optimal_turns") is not None:
+            self.solved += 1
+            if res["optimal_turns"] >= 0:
+                self.guaranteed += 1
+                self.optimal_turns.add(res["optimal_turns"])
+        if res.get("optimality_gap") is not None:
+            self.gap.add(res["optimality_gap"])
+
+    def summary(self):
+        """汇总表中该组的统计列"""
+        row = {
+            "avg_turns": self.turns.average(), "std_turns": self.turns.std(),
+            "avg_steps": self.steps.average(), "std_steps": self.steps.std(),
+            "stalemate_rate": self.stalemates / self.trials, "unreachable_rate": self.unreachable / self.trials,
+            "avg_search_ms": self.search_ms.average(),
+        }
+        # 搜索成本：每回合警察团队规划的平均耗时（毫秒）
+        row["search_ms_per_turn"] = row["avg_search_ms"] / row["avg_turns"] if row["avg_turns"] > 0 else math.nan
+        if SOLVE_OPTIMAL:
+            row["guaranteed_rate"] = self.guaranteed / self.solved if self.solved else math.nan
+            row["avg_optimal_turns"] = self.optimal_turns.average()
+            row["avg_optimality_gap"] = self.gap.average()
+        return row
+
+
+def append_csv(rows, path, new_file):
+    """把一个任务块的记录追加到 CSV，new_file 时覆盖旧文件并写表头"""
+    pd.DataFrame(rows).to_csv(path, mode="w" if new_file else "a", header=new_file, index=False)
+
+
+def detail_path(count, density, algo, assignment):
+    """每组详情文件的路径"""
+    safe_algo_name = algo.replace("*", "Star")
+    suffix = "" if assignment == "greedy" else f"_{assignment}"
+    return os.path.join(OUTPUT_DIR, f"detail_P{count}_D{density}_{safe_algo_name}{suffix}.csv")
+
+
+def experiment_config():
+    """决定实验结果的全部配置（与进程数无关），写入清单第一行，续跑时必须一致"""
+    return {
+        "size": MAP_SIZE, "police_counts": POLICE_COUNTS, "densities": DENSITIES, "algorithms": ALGORITHMS,
+        "assignments": ASSIGNMENTS, "trials": TRIALS_PER_GROUP, "chunk_size": CHUNK_SIZE, "base_seed": BASE_SEED,
+        "max_turns": MAX_TURNS_SAFETY, "batch_engine": USE_BATCH_ENGINE, "thief": THIEF_ALGORITHM,
+        "optimal": SOLVE_OPTIMAL, "connected": CONNECTED_MAPS, "corpus": MAP_CORPUS,
+    }
+
+
+# --- RunManifest 类 ---
+class RunManifest:
+    def __init__(self, path, config, restart=False):
+        """
+        运行目录中的检查点清单（JSON Lines）：第一行为实验配置，之后每完成一个任务块追加一行
+        {"task", "group", "trial_ids", "seeds", "raw_bytes", "detail_bytes"}，其中两个字节数是该块写完后
+        原始记录文件与该组详情文件的长度。任务块按固定顺序完成，已完成的总是任务列表的前缀。
+        :param config: experiment_config()，与已有清单不一致时拒绝续跑，避免混入另一组实验的结果
+        :param restart: 忽略已有清单，从头开始
+        """
+        self.path = path
+        self.completed = []
+        lines = []
+        if not restart and os.path.exists(path):
+            with open(path, "rb") as f:
+                lines = f.read().split(b"\n")
+        if len(lines) > 1:
+            if json.loads(lines[0]) != config:
+                raise ValueError(f"{path} 记录的实验配置与本次不同，使用 --restart 重新开始")
+            valid = len(lines[0]) + 1
+            for line in lines[1:]:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # 中断时写了一半的最后一行
+                self.completed.append(entry)
+                valid += len(line) + 1
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(config) + "\n")
+        self.file = open(path, "a", encoding="utf-8")
+
+    def record(self, entry):
+        """任务块的结果写入磁盘后调用；落盘后该块在续跑时不再运行"""
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def restore_checkpoint(manifest, tasks, raw_path):
+    """
+    续跑前恢复已完成的任务块：把原始记录与各组详情文件截断到最后一个检查点（丢弃检查点之后写入的残行），
+    再按文件顺序把原始记录重新累加进 GroupStats。累加顺序与不中断运行相同，汇总结果（包括耗时列）逐位一致。
+    :return: {分组键: GroupStats}
+    """
+    details = {}
+    for entry, (count, density, algo, assignment, trial_ids) in zip(manifest.completed, tasks):
+        if entry["group"] != [count, density, algo, assignment] or entry["trial_ids"] != trial_ids:
+            raise ValueError(f"{manifest.path} 的第 {entry['task']} 个任务块与本次任务列表不符，使用 --restart 重新开始")
+        details[detail_path(count, density, algo, assignment)] = entry["detail_bytes"]
+    for path, size in [(raw_path, manifest.completed[-1]["raw_bytes"])] + list(details.items()):
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+    group_stats = {}
+    # round_trip 保证读回的浮点数与写入前逐位相同
+    for frame in pd.read_csv(raw_path, chunksize=100000, float_precision="round_trip"):
+        for res in frame.to_dict("records"):
+            for column in ("optimal_turns", "optimality_gap"):
+                if column in res and pd.isna(res[column]):
+                    res[column] = None
+            key = (res["police_count"], res["density"], res["algorithm"], res["assignment"])
+            group_stats.setdefault(key, GroupStats()).add(res)
+    return group_stats
+
+
+def run_experiment(workers=1, size=None, assignments=None, thief_algorithm=None, solve_optimal=None,
+                   connected=None, corpus=None, traces=None, output=None, restart=False):
+    """
+    :param output: 运行目录（结果、检查点清单与缓存），None 表示 OUTPUT_DIR
+    :param restart: 忽略运行目录中的检查点，从头开始；否则跳过已完成的任务块继续运行
+    """
+    global ASSIGNMENTS, THIEF_ALGORITHM, SOLVE_OPTIMAL, CONNECTED_MAPS, MAP_CORPUS, TRACE_DIR, OUTPUT_DIR
+    if output:
+        OUTPUT_DIR = output
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if size:
+        set_map_size(size)
+    if assignments:
+        ASSIGNMENTS = assignments
+    if thief_algorithm:
+        THIEF_ALGORITHM = thief_algorithm
+    if solve_optimal is not None:
+        SOLVE_OPTIMAL = solve_optimal
+    if connected is not None:
+        CONNECTED_MAPS = connected
+    if corpus:
+        MAP_CORPUS = corpus
+        prepare_corpus()
+    if traces:
+        TRACE_DIR = traces
+    total_groups = len(POLICE_COUNTS) * len(DENSITIES) * len(ALGORITHMS) * len(ASSIGNMENTS)
+
+    tasks = make_tasks()
+    raw_path = os.path.join(OUTPUT_DIR, "all_trials_raw.csv")
+    manifest = RunManifest(os.path.join(OUTPUT_DIR, "manifest.jsonl"), experiment_config(), restart)
+    done = len(manifest.completed)
+    # 逐块汇总：每组只保留 GroupStats，逐轮记录按块追加到原始记录与各组详情文件
+    group_stats = restore_checkpoint(manifest, tasks, raw_path) if done else {}
+
+    print(f"开始自动化实验任务... (进程数: {workers}, 地图: {MAP_SIZE}x{MAP_SIZE}, 小偷: {THIEF_ALGORITHM})")
+    if done:
+        print(f"从检查点继续：已完成 {done}/{len(tasks)} 个任务块")
+    finished_groups = sum(task[4][-1] == TRIALS_PER_GROUP for task in tasks[:done])
+    pbar_total = tqdm(total=total_groups, initial=finished_groups, desc="总进度", position=0, leave=True,
+                      file=sys.stdout, dynamic_ncols=True)
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                   initargs=(MAP_SIZE, THIEF_ALGORITHM, SOLVE_OPTIMAL, CONNECTED_MAPS, MAP_CORPUS,
+                                             TRACE_DIR, OUTPUT_DIR)) if workers > 1 else None
+    # executor.map 按提交顺序返回结果，各组详情与汇总始终按固定顺序产生
+    chunk_results = executor.map(run_chunk, tasks[done:]) if executor else map(run_chunk, tasks[done:])
+
+    try:
+        for task_index, ((count, density, algo, assignment, trial_ids), rows) in enumerate(
+                zip(tasks[done:], chunk_results), start=done):
+            group_desc = f"P={count}|D={density:.2f}|{algo}|{assignment}"
+            pbar_total.set_postfix_str(f"当前: {group_desc} | 轮次: {trial_ids[-1]}/{TRIALS_PER_GROUP}")
+
+            chunk_data, raw_data = [], []
+            for trial_id, total_turns, total_steps, reason, search_time, optimal_turns in rows:
+                res = {
+                    "police_count": count, "density": density, "algorithm": algo,
+                    "assignment": assignment, "thief": THIEF_ALGORITHM, "trial_id": trial_id, "total_turns": total_turns,
+                    "total_steps": total_steps, "game_over_reason": reason,
+                    "search_ms": search_time * 1000
+                }
+                raw = res
+                if SOLVE_OPTIMAL:
+                    # -1 表示小偷可以无限期逃脱，空值表示地图过大未求解
+                    res["optimal_turns"] = optimal_turns
+                    # 与最优解的差距（只写入原始记录）：只统计实际抓捕成功且最优策略保证抓捕的轮次
+                    captured = reason not in (STALEMATE_REASON, UNREACHABLE_REASON, "Timeout")
+                    guaranteed = optimal_turns is not None and optimal_turns >= 0
+                    raw = dict(res, optimality_gap=total_turns - optimal_turns if captured and guaranteed else None)
+                chunk_data.append(res)
+                raw_data.append(raw)
+                group_stats.setdefault((count, density, algo, assignment), GroupStats()).add(raw)
+
+            # 各组详情按块追加（该组第一个任务块时新建文件），写入后记录检查点
+            group_path = detail_path(count, density, algo, assignment)
+            append_csv(chunk_data, group_path, new_file=trial_ids[0] == 1)
+            append_csv(raw_data, raw_path, new_file=task_index == 0)
+            manifest.record({
+                "task": task_index, "group": [count, density, algo, assignment], "trial_ids": trial_ids,
+                "seeds": [trial_seed(count, density, algo, trial_id) for trial_id in trial_ids],
+                "raw_bytes": os.path.getsize(raw_path), "detail_bytes": os.path.getsize(group_path),
+            })
+
+            if trial_ids[-1] == TRIALS_PER_GROUP:
+                pbar_total.update(1)
+    finally:
+        manifest.close()
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    pbar_total.close()
+    print("\n\n所有实验逻辑运行完毕，正在生成汇总报表...")
+
+    # 汇总表只由各组的 GroupStats 生成，行顺序与按分组键排序一致
+    keys = ["police_count", "density", "algorithm", "assignment"]
+    summary = pd.DataFrame([dict(zip(keys, key), **stats.summary()) for key, stats in group_stats.items()])
+    summary = summary.sort_values(keys, ignore_index=True)
 
     # 将僵局率转为百分比
     summary["stalemate_rate"] = summary["stalemate_rate"].map(lambda x: f"{x:.2%}")
+    summary["unreachable_rate"] = summary["unreachable_rate"].map(lambda x: f"{x:.2%}")
 
     summary.to_csv(os.path.join(OUTPUT_DIR, "experiment_summary.csv"), index=False)
+    if "greedy" in ASSIGNMENTS and len(ASSIGNMENTS) > 1:
+        write_assignment_comparison(group_stats)
     print(f"✅ 实验成功！报表位置: {os.path.join(OUTPUT_DIR, 'experiment_summary.csv')}")
 
 
+def write_assignment_comparison(group_stats):
+    """
+    以贪心分配为基准逐组对比其他分配方式：平均回合数、平均步数、抓捕率，以及每回合节省的规划耗时
+    （毫秒与百分比，负数表示更慢）。贪心分配交给批量模拟器的算法耗时是整批均摊值，与逐局计时不可比，
+    这些组的耗时列留空。
+    """
+    rows = []
+    for (count, density, algo, mode), stats in group_stats.items():
+        greedy = group_stats.get((count, density, algo, "greedy"))
+        if mode == "greedy" or greedy is None:
+            continue
+        base, other = greedy.summary(), stats.summary()
+        row = {
+            "police_count": count, "density": density, "algorithm": algo, "assignment": mode,
+            "greedy_avg_turns": base["avg_turns"], "avg_turns": other["avg_turns"],
+            "greedy_avg_steps": base["avg_steps"], "avg_steps": other["avg_steps"],
+            "greedy_capture_rate": f"{greedy.captures / greedy.trials:.2%}",
+            "capture_rate": f"{stats.captures / stats.trials:.2%}",
+            "greedy_ms_per_turn": math.nan, "ms_per_turn": math.nan, "saved_ms_per_turn": math.nan, "saved_pct": math.nan,
+        }
+        if not use_batch_engine(algo):
+            saved = base["search_ms_per_turn"] - other["search_ms_per_turn"]
+            row.update(greedy_ms_per_turn=base["search_ms_per_turn"], ms_per_turn=other["search_ms_per_turn"],
+                       saved_ms_per_turn=saved, saved_pct=saved / base["search_ms_per_turn"] * 100)
+        rows.append(row)
+    if not rows:
+        return
+    comparison = pd.DataFrame(rows).sort_values(["police_count", "density", "algorithm", "assignment"], ignore_index=True)
+    comparison.to_csv(os.path.join(OUTPUT_DIR, "assignment_comparison.csv"), index=False)
+
+
 if __name__ == "__main__":
-    run_experiment()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="警察抓小偷自动化实验")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数，1 表示串行运行")
+    parser.add_argument("--size", type=int, default=c.GRID_SIZE, help="地图边长（格），大地图自动启用 HPA* 距离查询")
+    parser.add_argument("--assignment", default=",".join(ASSIGNMENTS),
+                        help=f"围堵格分配方式，逗号分隔，可选: {','.join(ASSIGNMENT_MODES)}")
+    parser.add_argument("--thief", choices=list(THIEF_ALGORITHMS), default=THIEF_ALGORITHM, help="小偷算法")
+    parser.add_argument("--connected", action="store_true", help="保证小偷与警察出生在同一连通分量")
+    parser.add_argument("--corpus", help="地图语料库目录：缺少的文件先生成，之后所有算法使用同一批地图")
+    parser.add_argument("--optimal", action="store_true", help="用逆向分析求最优抓捕回合数并报告各算法的差距（仅限小地图）")
+    parser.add_argument("--traces", help="对局轨迹目录：每轮写入一个轨迹文件（逐轮运行，不使用批量模拟器）")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="运行目录：结果与检查点清单，中断后用同样的参数重新运行即从检查点继续")
+    parser.add_argument("--restart", action="store_true", help="忽略运行目录中的检查点，从头开始")
+    args = parser.parse_args()
+    assignments = args.assignment.split(",")
+    for mode in assignments:
+        if mode not in ASSIGNMENT_MODES:
+            parser.error(f"未知的分配方式: {mode}")
+    run_experiment(workers=args.workers, size=args.size, assignments=assignments, thief_algorithm=args.thief,
+                   solve_optimal=args.optimal, connected=args.connected,
+                   corpus=args.corpus, traces=args.traces, output=args.output, restart=args.restart)
\ No newline at end of file
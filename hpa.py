@@ -0,0 +1,186 @@
+# 分层寻路（HPA*）：把地图划分为簇，预先找出簇间入口，先在入口图上规划粗略路线，再在警察附近局部细化
+import heapq
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from constants import CELL_OBSTACLE, CLUSTER_SIZE, ENTRANCE_SPLIT_LENGTH, ROUTE_CACHE_SIZE
+
+
+# --- ClusterGraph 类 ---
+class ClusterGraph:
+    def __init__(self, game_map, cluster_size=CLUSTER_SIZE):
+        """
+        构建抽象图：每条簇边界上的连续可通行段为一个入口，短入口在中点、长入口在两端各放一对过渡格。
+        过渡格之间的簇间边代价为 1；簇内入口之间的距离首次用到时在簇内 BFS 计算并缓存。
+        :param game_map: GridMap 实例
+        :param cluster_size: 簇边长（格）
+        """
+        self.size = game_map.size
+        self.cluster_size = cluster_size
+        self.clusters_per_row = -(-self.size // cluster_size)
+        self.indptr, self.indices = game_map.adjacency
+
+        self.entrances = {}    # 簇编号 -> 该簇内的过渡格下标列表
+        self.inter_edges = {}  # 过渡格 -> 相邻簇中对应过渡格列表（代价 1）
+        self._intra = {}       # 过渡格 -> [(同簇过渡格, 簇内距离), ...]，按需计算
+        self._local = OrderedDict()   # 起点/目标插入抽象图时的簇内距离，按 LRU 缓存
+        self._routes = OrderedDict()  # (起点, 目标) -> (路线长度, 第一个路标)，按 LRU 缓存
+        self._build_entrances(game_map.grid != CELL_OBSTACLE)
+
+    def cluster_of(self, idx):
+        r, c = divmod(idx, self.size)
+        return (r // self.cluster_size) * self.clusters_per_row + c // self.cluster_size
+
+    # ================== 入口检测 ==================
+    def _build_entrances(self, free):
+        size, cs = self.size, self.cluster_size
+        for border in range(cs, size, cs):
+            # 竖直边界：左右两列都可通行的行；水平边界：上下两行都可通行的列
+            self._add_border(free[:, border - 1] & free[:, border],
+                             lambda i, b=border: (i * size + b - 1, i * size + b))
+            self._add_border(free[border - 1, :] & free[border, :],
+                             lambda i, b=border: ((b - 1) * size + i, b * size + i))
+
+    def _add_border(self, open_cells, transition):
+        """open_cells 为沿边界的布尔数组；连续段不跨越簇的分界，每段放置一到两对过渡格"""
+        cs = self.cluster_size
+        positions = np.arange(len(open_cells))
+        previous = np.concatenate(([False], open_cells[:-1]))
+        following = np.concatenate((open_cells[1:], [False]))
+        starts = positions[open_cells & (~previous | (positions % cs == 0))]
+        ends = positions[open_cells & (~following | (positions % cs == cs - 1))]
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end - start + 1 < ENTRANCE_SPLIT_LENGTH:
+                offsets = ((start + end) // 2,)
+            else:
+                offsets = (start, end)
+            for i in offsets:
+                a, b = transition(i)
+                self._add_node(a)
+                self._add_node(b)
+                self.inter_edges[a].append(b)
+                self.inter_edges[b].append(a)
+
+    def _add_node(self, idx):
+        if idx not in self.inter_edges:
+            self.inter_edges[idx] = []
+            self.entrances.setdefault(self.cluster_of(idx), []).append(idx)
+
+    # ================== 簇内距离 ==================
+    def _cluster_bfs(self, source):
+        """只在 source 所在簇内做 BFS，返回 {格子下标: 距离}"""
+        size, cs = self.size, self.cluster_size
+        sr, sc = divmod(source, size)
+        r0, c0 = sr - sr % cs, sc - sc % cs
+        indptr, indices = self.indptr, self.indices
+        dist = {source: 0}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            next_dist = dist[current] + 1
+            for k in range(indptr[current], indptr[current + 1]):
+                nxt = indices[k]
+                if nxt in dist:
+                    continue
+                nr, nc = divmod(nxt, size)
+                if r0 <= nr < r0 + cs and c0 <= nc < c0 + cs:
+                    dist[nxt] = next_dist
+                    queue.append(nxt)
+        return dist
+
+    def _local_distances(self, idx):
+        """起点或目标到所在簇各过渡格的距离（含簇内全部格子的距离表），LRU 缓存"""
+        dist = self._local.get(idx)
+        if dist is None:
+            dist = self._cluster_bfs(idx)
+            self._local[idx] = dist
+            if len(self._local) > ROUTE_CACHE_SIZE:
+                self._local.popitem(last=False)
+        else:
+            self._local.move_to_end(idx)
+        return dist
+
+    def _neighbors(self, node):
+        """抽象图邻居：簇间边与（按需计算的）簇内边"""
+        intra = self._intra.get(node)
+        if intra is None:
+            dist = self._cluster_bfs(node)
+            intra = [(other, dist[other]) for other in self.entrances[self.cluster_of(node)]
+                     if other != node and other in dist]
+            intra.extend((partner, 1) for partner in self.inter_edges[node])
+            self._intra[node] = intra
+        return intra
+
+    # ================== 查询 ==================
+    def route(self, start_idx, goal_idx):
+        """
+        粗略规划：返回 (路线长度, 第一个路标下标)，路标为路线上起点之后的第一个过渡格，
+        起点与目标在同簇内直接相连时为目标本身；不可达时返回 (None, -1)。
+        """
+        key = (start_idx, goal_idx)
+        cached = self._routes.get(key)
+        if cached is not None:
+            self._routes.move_to_end(key)
+            return cached
+
+        result = self._search(start_idx, goal_idx)
+        self._routes[key] = result
+        if len(self._routes) > ROUTE_CACHE_SIZE:
+            self._routes.popitem(last=False)
+        return result
+
+    def _search(self, start_idx, goal_idx):
+        if start_idx == goal_idx:
+            return 0, goal_idx
+        size = self.size
+        gr, gc = divmod(goal_idx, size)
+        start_dist = self._local_distances(start_idx)
+        goal_dist = self._local_distances(goal_idx)
+        goal_cluster = self.cluster_of(goal_idx)
+        goal_links = {node: goal_dist[node] for node in self.entrances.get(goal_cluster, ()) if node in goal_dist}
+
+        # 同簇且簇内可达时先以簇内直达路线为上界
+        best, best_first = None, -1
+        if goal_idx in start_dist:
+            best, best_first = start_dist[goal_idx], goal_idx
+
+        g_score = {}
+        first = {}  # 抽象节点 -> 路线上起点之后的第一个路标
+        pq = []
+        for node in self.entrances.get(self.cluster_of(start_idx), ()):
+            d = start_dist.get(node)
+            if d is not None:
+                g_score[node] = d
+                first[node] = node if node != start_idx else -1
+                nr, nc = divmod(node, size)
+                heapq.heappush(pq, (d + abs(nr - gr) + abs(nc - gc), -d, node))
+
+        # f 相同时优先扩展 g 较大（更接近目标）的节点，减少平台区域的无效扩展
+        while pq:
+            f, g, node = heapq.heappop(pq)
+            g = -g
+            if g > g_score[node]:
+                continue
+            if best is not None and f >= best:
+                break
+            if node in goal_links and (best is None or g + goal_links[node] < best):
+                best = g + goal_links[node]
+                best_first = first[node] if first[node] >= 0 else goal_idx
+            for nxt, cost in self._neighbors(node):
+                new_g = g + cost
+                if nxt not in g_score or new_g < g_score[nxt]:
+                    g_score[nxt] = new_g
+                    first[nxt] = first[node] if first[node] >= 0 else nxt
+                    nr, nc = divmod(nxt, size)
+                    heapq.heappush(pq, (new_g + abs(nr - gr) + abs(nc - gc), -new_g, nxt))
+
+        if best is None:
+            return None, -1
+        return best, best_first
+
+    def distance(self, a, b):
+        """近似最短路径长度（抽象图路线长度），不可达时返回 None"""
+        length, _ = self.route(a[0] * self.size + a[1], b[0] * self.size + b[1])
+        return length
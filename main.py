@@ -1,24 +1,119 @@
+import argparse
+import itertools
+import os
+import random
+import time
+
+import numpy as np
 import pygame
 
 # 依次导入常量、UI 组件、地图逻辑、算法
 import constants as c
-from ui_elements import Button
-from map import GridMap
-from utils import (
-    move_thief,
-    find_cooperative_target,
-    move_police_with_strategy,
-    POLICE_ALGORITHMS
-)
+from ui_elements import Button, get_font, render_text
+from replay import TracePlayer
+from simulation import Simulation, SimulationWorker, Snapshot
+from utils import ASSIGNMENT_MODES, POLICE_ALGORITHMS, TEAM_ALGORITHMS, THIEF_ALGORITHMS
+
+GRID_LINE_COLOR = (50, 80, 50)
+
+
+# --- Camera 类 ---
+class Camera:
+    def __init__(self, map_size, view_rect):
+        """
+        地图视口：记录左上角格子与缩放级别，只有视口内的格子会被绘制
+        :param map_size: 地图尺寸（格）
+        :param view_rect: 屏幕上的地图显示区域（像素）
+        """
+        self.map_size = map_size
+        self.view_rect = pygame.Rect(view_rect)
+        self.zoom_index = c.ZOOM_LEVELS.index(c.TILE_SIZE)
+        self.row = 0
+        self.col = 0
+        self.follow = False  # 是否自动跟随小偷
+
+    @property
+    def tile(self):
+        return c.ZOOM_LEVELS[self.zoom_index]
+
+    @property
+    def rows(self):
+        """视口内可见的行数：按向上取整计，并裁剪到地图边界，即视口实际切出的行数"""
+        return min(self.map_size - self.row, -(-self.view_rect.height // self.tile))
+
+    @property
+    def cols(self):
+        return min(self.map_size - self.col, -(-self.view_rect.width // self.tile))
+
+    @property
+    def shows_whole_map(self):
+        return self.map_size * self.tile <= min(self.view_rect.width, self.view_rect.height)
+
+    def _clamp(self):
+        # 按视口能完整容纳的格数限制，滚到底时最后一行/列完整显示，多出的不足一格的区域保持黑色
+        self.row = max(0, min(self.row, self.map_size - self.view_rect.height // self.tile))
+        self.col = max(0, min(self.col, self.map_size - self.view_rect.width // self.tile))
+
+    def scroll(self, d_row, d_col):
+        """滚动视口，返回视口是否发生变化"""
+        old = (self.row, self.col)
+        self.row += d_row
+        self.col += d_col
+        self._clamp()
+        return (self.row, self.col) != old
+
+    def zoom(self, step):
+        """以视口中心为基准缩放，返回视口是否发生变化"""
+        new_index = max(0, min(self.zoom_index + step, len(c.ZOOM_LEVELS) - 1))
+        if new_index == self.zoom_index:
+            return False
+        center = (self.row + self.rows // 2, self.col + self.cols // 2)
+        self.zoom_index = new_index
+        self.center_on(center)
+        return True
+
+    def center_on(self, cell):
+        old = (self.row, self.col)
+        self.row = cell[0] - self.view_rect.height // self.tile // 2
+        self.col = cell[1] - self.view_rect.width // self.tile // 2
+        self._clamp()
+        return (self.row, self.col) != old
+
+    def keep_visible(self, cell, margin=3):
+        """目标离视口边缘少于 margin 格时重新居中，避免跟随模式每回合都整屏重绘"""
+        r, col = cell
+        if (self.row + margin <= r < self.row + self.rows - margin
+                and self.col + margin <= col < self.col + self.cols - margin):
+            return False
+        return self.center_on(cell)
+
+    def is_visible(self, cell):
+        return self.row <= cell[0] < self.row + self.rows and self.col <= cell[1] < self.col + self.cols
+
+    def cell_rect(self, cell):
+        """格子在屏幕上的矩形"""
+        tile = self.tile
+        return pygame.Rect(
+            self.view_rect.x + (cell[1] - self.col) * tile,
+            self.view_rect.y + (cell[0] - self.row) * tile,
+            tile,
+            tile
+        )
+
 
 # --- Game 类 ---
 class Game:
-    def __init__(self, size, initial_police_count, headless=False):
+    def __init__(self, size, initial_police_count, headless=False, assignment="greedy",
+                 thief_algorithm=next(iter(THIEF_ALGORITHMS)), connected=False, record_dir=None):
         """
         初始化游戏实例
         :param size: 地图尺寸
         :param initial_police_count: 初始警察数量
         :param headless: 是否开启无界面模式（用于自动化实验）
+        :param assignment: 围堵格分配方式，见 ASSIGNMENT_MODES
+        :param thief_algorithm: 小偷算法名称，见 THIEF_ALGORITHMS；界面模式下每步搜索受 THIEF_TIME_BUDGET 限制
+        :param connected: 是否保证小偷与警察出生在同一连通分量
+        :param record_dir: 对局轨迹目录，每局结束时写入一个轨迹文件，None 表示不记录
         """
         self.headless = headless
         self.size = size
@@ -27,7 +122,6 @@ class Game:
         self.density_options = c.DENSITY_OPTIONS
         self.current_density_index = c.DEFAULT_DENSITY_INDEX
         self.current_obstacle_density = self.density_options[self.current_density_index]
-        self.map_data = None
 
         # 2. FPS 与速度配置
         self.fps_options = c.FPS_OPTIONS
@@ -35,23 +129,28 @@ class Game:
         self.fps = self.fps_options[self.current_fps_index]
         self.move_interval = 1000 / self.fps
         self.move_timer = 0
+        self.turbo = False  # 极速模式：不受 FPS 限制，每帧推进 TURBO_FRAME_BUDGET 毫秒内能完成的子步骤
 
         # 3. AI 算法配置
-        self.algorithm_list = list(POLICE_ALGORITHMS.keys())
+        self.algorithm_list = list(POLICE_ALGORITHMS.keys()) + list(TEAM_ALGORITHMS.keys())
         self.algorithm_index = 0
         self.police_algorithm = self.algorithm_list[self.algorithm_index]
 
-        # 4. 游戏状态跟踪
+        # 4. 游戏状态跟踪（回合逻辑由不依赖 pygame 的 Simulation 负责）
         self.running = True
         self.state = c.GAME_STATES["MENU"]
-        self.turn = 0
-        self.total_steps = 0
-        self.game_over_reason = ""
         self.current_police_count = initial_police_count
-        self.current_police_index = 0  # 追踪当前移动的警察编号
-        self.sub_step_state = "POLICE"  # 当前子阶段：POLICE 或 THIEF
-        self.max_history_size = 50
-        self.history_states = []
+        self.record_dir = record_dir
+        self.replaying = False  # 回放模式：self.sim 为 TracePlayer，不做任何寻路
+        self.paused = False
+        # 界面模式下对局在后台线程中推进，界面只绘制从队列取出的快照，慢速搜索不会卡住绘制与输入
+        self.worker = None
+        self.snapshot = None  # 当前显示的局面
+        # 界面模式限制小偷每步的搜索时间以保持画面流畅，无界面模式不限时以保证结果可复现
+        thief_time_budget = None if headless else c.THIEF_TIME_BUDGET
+        self.sim = Simulation(size, initial_police_count, self.current_obstacle_density, self.police_algorithm,
+                              assignment, thief_algorithm, thief_time_budget, connected,
+                              record=record_dir is not None)
 
         # 5. 图形界面与多媒体初始化（仅在非静默模式下运行）
         if not self.headless:
@@ -60,27 +159,65 @@ class Game:
             pygame.display.set_caption(c.CAPTION)
             self.clock = pygame.time.Clock()
 
-            # 字体初始化
-            try:
-                self.font_small = pygame.font.Font(c.SIMHEI_FONT_PATH, 22)
-                self.font_medium = pygame.font.Font(c.SIMHEI_FONT_PATH, 26)
-                self.font_large = pygame.font.Font(c.SIMHEI_FONT_PATH, 32)
-            except (FileNotFoundError, OSError):
-                # 备用方案：如果找不到黑体，使用系统默认字体
-                self.font_small = pygame.font.Font(None, 22)
-                self.font_medium = pygame.font.Font(None, 26)
-                self.font_large = pygame.font.Font(None, 32)
+            # 字体初始化（与按钮共享，找不到黑体时自动使用系统默认字体）
+            self.font_small = get_font(22)
+            self.font_medium = get_font(26)
+            self.font_large = get_font(32)
 
             self.font_menu = self.font_large
             self.font_count = self.font_medium
 
+            # 地图视口（支持滚动与缩放），长按方向键连续滚动
+            self.camera = Camera(size, (0, c.MAP_OFFSET_Y, c.SCREEN_WIDTH, c.MAP_VIEW_HEIGHT))
+            pygame.key.set_repeat(200, 50)
+
+            # 渲染缓存：视口背景只在开局或视口变化时绘制，角色只重绘发生变化的格子
+            self.background = None
+            self.minimap = None
+            self.drawn_cells = {}  # 上一帧屏幕上的角色：{(r, c): [绘制项, ...]}
+            self.needs_full_redraw = True
+
             # 初始化菜单按钮
             self.setup_menu()
         else:
-            # 静默模式下，clock 仍然需要，但不需要显示器
-            self.clock = pygame.time.Clock()
+            # 静默模式下不需要显示器与时钟
+            self.clock = None
             self.screen = None
 
+    # ================== 模拟状态（只读转发） ==================
+    @property
+    def map_data(self):
+        """地图本身（网格不随对局变化）；角色位置以当前快照为准"""
+        return self.sim.map_data
+
+    @property
+    def thief_pos(self):
+        return self.snapshot.thief_pos
+
+    @property
+    def police_positions(self):
+        return self.snapshot.police_positions
+
+    @property
+    def turn(self):
+        return self.snapshot.turn
+
+    @property
+    def total_steps(self):
+        return self.snapshot.total_steps
+
+    @property
+    def game_over_reason(self):
+        return self.snapshot.game_over_reason
+
+    @property
+    def current_police_index(self):
+        return self.snapshot.current_police_index
+
+    @property
+    def sub_step_state(self):
+        return self.snapshot.sub_step_state
+
     # ================== MENU 布局 ==================
     def setup_menu(self):
         center_x = c.SCREEN_WIDTH // 2
@@ -138,53 +275,99 @@ class Game:
             self.current_fps_index += 1
             self.fps = self.fps_options[self.current_fps_index]
             self.move_interval = 1000 / self.fps
+        else:
+            self.turbo = True
     def decrease_fps(self):
-        if self.current_fps_index > 0:
+        if self.turbo:
+            self.turbo = False
+        elif self.current_fps_index > 0:
             self.current_fps_index -= 1
             self.fps = self.fps_options[self.current_fps_index]
             self.move_interval = 1000 / self.fps
 
-    def start_game(self, algo_override=None, density_override=None, count_override=None):
-        """修改 start_game 允许外部传入实验参数"""
+    def start_game(self, algo_override=None, density_override=None, count_override=None, seed=None):
+        """
+        修改 start_game 允许外部传入实验参数
+        :param seed: 本局随机种子，None 表示抽取一个；种子写入轨迹元数据，可据此重新生成同一局
+        """
         if algo_override: self.police_algorithm = algo_override
         if density_override is not None: self.current_obstacle_density = density_override
         if count_override: self.current_police_count = count_override
 
-        # 初始化地图
-        self.map_data = GridMap(
-            self.size,
-            self.current_police_count,
-            self.current_obstacle_density
+        # 上一局的后台线程可能仍在完成当前子步骤，新的一局使用新的 Simulation 实例
+        self.stop_worker()
+        if not self.headless:
+            old = self.sim
+            self.sim = Simulation(old.size, old.police_count, old.obstacle_density, old.police_algorithm,
+                                  old.assignment, old.thief_algorithm, old.thief_time_budget, old.connected,
+                                  old.record)
+
+        # 初始化地图与游戏状态
+        if seed is None:
+            seed = random.getrandbits(64)  # 从全局随机状态抽取：事先调用 random.seed 的调用方仍得到可复现的对局
+        self.sim.reset(
+            seed,
+            police_algorithm=self.police_algorithm,
+            obstacle_density=self.current_obstacle_density,
+            police_count=self.current_police_count
         )
+        self.enter_game()
 
-        # 初始化游戏状态
-        self.turn = 0
-        self.total_steps = 0
-        self.history_states.clear()
-        self.game_over_reason = ""
+    def start_replay(self, player, fps=None):
+        """
+        回放轨迹文件：用 TracePlayer 代替 Simulation，界面与对局时相同
+        :param player: TracePlayer 实例
+        :param fps: 回放速度（每秒子步骤数），可以是任意正数，None 表示沿用当前设置
+        """
+        self.sim = player
+        self.replaying = True
+        self.police_algorithm = player.metadata.get("police_algorithm", "")
+        self.current_obstacle_density = player.metadata.get("obstacle_density", 0.0)
+        if fps:
+            self.fps = fps
+            self.move_interval = 1000 / fps
+        self.enter_game()
+
+    def enter_game(self):
+        self.snapshot = Snapshot(self.sim)
+        if not self.headless:
+            if not self.replaying and not self.sim.over:
+                self.worker = SimulationWorker(self.sim)
+            self.camera.center_on(self.thief_pos)
+            self.build_minimap()
+            self.build_background()
+            self.needs_full_redraw = True
 
         # 切换到运行状态
         self.state = c.GAME_STATES["RUNNING"]
+
+    def stop_worker(self):
+        """取消后台模拟线程（返回菜单、开始新的一局或退出时）"""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
     def quit_game(self):
+        self.stop_worker()
         self.running = False
 
     # ================== MENU 绘制 ==================
     def draw_menu(self):
         cx = c.SCREEN_WIDTH // 2
 
-        self.screen.blit(self.font_menu.render("警察抓小偷", True, c.WHITE),
-                         self.font_menu.render("警察抓小偷", True, c.WHITE).get_rect(center=(cx, c.SCREEN_HEIGHT // 4)))
+        title_surf = render_text(self.font_menu, "警察抓小偷", c.WHITE)
+        self.screen.blit(title_surf, title_surf.get_rect(center=(cx, c.SCREEN_HEIGHT // 4)))
 
         def draw_item(label, value, y):
-            self.screen.blit(self.font_medium.render(label, True, c.WHITE),
-                             self.font_medium.render(label, True, c.WHITE).get_rect(center=(cx - 200, y)))
-            self.screen.blit(self.font_medium.render(value, True, c.YELLOW),
-                             self.font_medium.render(value, True, c.YELLOW).get_rect(center=(cx, y)))
+            label_surf = render_text(self.font_medium, label, c.WHITE)
+            self.screen.blit(label_surf, label_surf.get_rect(center=(cx - 200, y)))
+            value_surf = render_text(self.font_medium, value, c.YELLOW)
+            self.screen.blit(value_surf, value_surf.get_rect(center=(cx, y)))
 
         draw_item("警察数量", str(self.current_police_count), c.SCREEN_HEIGHT // 2 - 100)
         draw_item("障碍物密度", f"{self.current_obstacle_density:.2f}", c.SCREEN_HEIGHT // 2 - 20)
         draw_item("警察算法", self.police_algorithm, c.SCREEN_HEIGHT // 2 + 60)
-        draw_item("FPS", str(self.fps), c.SCREEN_HEIGHT // 2 + 140)
+        draw_item("FPS", "极速" if self.turbo else str(self.fps), c.SCREEN_HEIGHT // 2 + 140)
 
         for btn in [
             self.btn_minus, self.btn_plus,
@@ -206,11 +389,11 @@ class Game:
         y_center = c.TOP_BAR_HEIGHT // 2
 
         # --- 左侧：核心进度 ---
-        turn_surf = self.font_small.render(f"回合: {self.turn}", True, c.WHITE)
+        turn_surf = render_text(self.font_small, f"回合: {self.turn}", c.WHITE)
         self.screen.blit(turn_surf, (padding, y_center - turn_surf.get_height() // 2))
 
         # --- 中间：累积步数 ---
-        step_surf = self.font_small.render(f"警察总步数: {self.total_steps}", True, c.LIGHT_BLUE)
+        step_surf = render_text(self.font_small, f"警察总步数: {self.total_steps}", c.LIGHT_BLUE)
         self.screen.blit(step_surf,
                          (c.SCREEN_WIDTH // 2 - step_surf.get_width() // 2, y_center - step_surf.get_height() // 2))
 
@@ -220,12 +403,21 @@ class Game:
             c.GAME_STATES["GAME_OVER"]: ("已结束", c.RED)
         }
         status_text, status_color = status_map.get(self.state, ("等待中", c.WHITE))
-
-        state_surf = self.font_small.render(status_text, True, status_color)
+        if self.state == c.GAME_STATES["RUNNING"]:
+            if self.worker is not None and self.worker.skipping.is_set():
+                status_text, status_color = "计算结果中", c.YELLOW
+            elif self.replaying and self.paused:
+                status_text, status_color = "已暂停", c.YELLOW
+            elif self.turbo:
+                status_text, status_color = "极速", c.GREEN
+            elif self.replaying:
+                status_text, status_color = "回放中", c.GREEN
+
+        state_surf = render_text(self.font_small, status_text, status_color)
         self.screen.blit(state_surf,
                          (c.SCREEN_WIDTH - state_surf.get_width() - padding, y_center - state_surf.get_height() // 2))
     def draw_bottom_bar(self):
-        y_start = c.TOP_BAR_HEIGHT + c.GRID_SIZE * c.TILE_SIZE
+        y_start = c.TOP_BAR_HEIGHT + c.MAP_VIEW_HEIGHT
         # 绘制背景
         pygame.draw.rect(self.screen, (20, 20, 20), (0, y_start, c.SCREEN_WIDTH, c.BOTTOM_BAR_HEIGHT))
         # 顶部装饰线
@@ -235,133 +427,256 @@ class Game:
         y_center = y_start + c.BOTTOM_BAR_HEIGHT // 2
 
         # --- 左侧：环境配置 ---
-        config_text = f"配置: 警察x{len(self.map_data.police_positions)} | 密度:{self.current_obstacle_density:.2f}"
-        config_surf = self.font_small.render(config_text, True, c.GRAY)
+        config_text = f"配置: 警察x{len(self.police_positions)} | 密度:{self.current_obstacle_density:.2f}"
+        config_surf = render_text(self.font_small, config_text, c.GRAY)
         self.screen.blit(config_surf, (padding, y_center - config_surf.get_height() // 2))
 
         # --- 右侧：当前算法 ---
         algo_text = f"AI算法: {self.police_algorithm}"
-        algo_surf = self.font_small.render(algo_text, True, c.YELLOW)
+        algo_surf = render_text(self.font_small, algo_text, c.YELLOW)
         self.screen.blit(algo_surf, (c.SCREEN_WIDTH - algo_surf.get_width() - padding, y_center - algo_surf.get_height() // 2))
 
     # ================== 游戏逻辑 ==================
     def handle_turn(self):
+        """推进一个子步骤，返回是否得到了新的局面"""
         if not self.map_data or self.state != c.GAME_STATES["RUNNING"]:
-            return
-
-        # --- 1. 警察移动阶段 ---
-        if self.sub_step_state == "POLICE":
-            # 获取当前要移动的警察数据
-            pid, cur_pos = self.map_data.police_positions[self.current_police_index]
-
-            # 准备阻塞位置（其他警察的位置）
-            blocked = {pos for i, (_, pos) in enumerate(self.map_data.police_positions) if
-                       i != self.current_police_index}
-
-            # 计算目标（依然使用协作逻辑，但只针对当前警察）
-            police_targets = find_cooperative_target(self.map_data.thief_pos, self.map_data.police_positions,
-                                                     self.map_data)
-            target = police_targets.get(cur_pos, self.map_data.thief_pos)
-
-            # 计算下一步
-            next_pos = move_police_with_strategy(cur_pos, target, self.map_data, blocked, self.police_algorithm)
-
-            # 执行移动
-            if next_pos != cur_pos:
-                self.map_data.police_positions[self.current_police_index] = (pid, next_pos)
-                self.total_steps += 1
+            return False
+
+        if self.worker is not None:
+            snapshot = self.worker.poll()
+            # 跳到结果前已算出的中间快照直接丢弃
+            while snapshot is not None and self.worker.skipping.is_set() and not snapshot.over:
+                snapshot = self.worker.poll()
+            if snapshot is None:
+                return False  # 后台线程还在搜索，本帧保持原画面
+        else:
+            self.sim.step()
+            snapshot = Snapshot(self.sim)
+        self.snapshot = snapshot
 
-            # 检查抓捕
-            if next_pos == self.map_data.thief_pos:
-                self.state = c.GAME_STATES["GAME_OVER"]
-                self.game_over_reason = f"警察 {pid} 完成抓捕"
-                return
+        if snapshot.over:
+            self.worker = None  # 线程在放入最后一个快照后已退出
+            self.state = c.GAME_STATES["GAME_OVER"]
+            if self.record_dir and not self.replaying:
+                self.save_trace()
+            if not self.headless:
+                self.needs_full_redraw = True
+        return True
 
-            # 轮向下一个警察或转入小偷回合
-            self.current_police_index += 1
-            if self.current_police_index >= len(self.map_data.police_positions):
-                self.current_police_index = 0
-                self.sub_step_state = "THIEF"
-
-        # --- 2. 小偷移动阶段 ---
-        elif self.sub_step_state == "THIEF":
-            new_thief_pos = move_thief(self.map_data.thief_pos, self.map_data.police_positions, self.map_data)
-            self.map_data.thief_pos = new_thief_pos
-
-            # 检查小偷是否撞上警察
-            if any(pos == self.map_data.thief_pos for _, pos in self.map_data.police_positions):
-                self.state = c.GAME_STATES["GAME_OVER"]
-                self.game_over_reason = "小偷无处可逃"
+    def save_trace(self):
+        """
+        把刚结束的对局写入 record_dir。文件名的时间戳只精确到秒，同一秒内结束的对局依次加 _1、_2 ... 后缀；
+        以独占方式创建文件，不会覆盖已有轨迹
+        """
+        stem = os.path.join(self.record_dir, time.strftime("game_%Y%m%d_%H%M%S"))
+        for n in itertools.count():
+            try:
+                self.sim.save_trace(f"{stem}_{n}.trace" if n else f"{stem}.trace", overwrite=False)
                 return
+            except FileExistsError:
+                continue
 
-            # 小偷动完后，才算一个完整回合结束，进行僵局检测
-            self.turn += 1
-            self.sub_step_state = "POLICE"
-            self._check_stalemate()
-
-    # ================== 僵局检测逻辑 ==================
-    def _check_stalemate(self):
-        current_state = self._get_current_state()
-        if current_state in self.history_states:
+    def skip_to_end(self):
+        """跳过剩余对局，直接显示最终局面与结束面板"""
+        if self.state != c.GAME_STATES["RUNNING"]:
+            return
+        if self.worker is not None:
+            # 在后台线程中走无界面路径算完，期间界面照常响应
+            self.worker.skip_to_end()
+        elif self.replaying:
+            self.sim.seek(len(self.sim.words))
+            self.snapshot = Snapshot(self.sim)
             self.state = c.GAME_STATES["GAME_OVER"]
-            self.game_over_reason = "进入循环僵局"
         else:
-            self.history_states.append(current_state)
-            if len(self.history_states) > self.max_history_size:
-                self.history_states.pop(0)
-
-    def _get_current_state(self):
-        """格式化当前状态用于僵局检测"""
-        police_pos_tuple = tuple(sorted([pos for _, pos in self.map_data.police_positions]))
-        return (self.map_data.thief_pos, police_pos_tuple)
+            self.sim.run()
+            self.handle_turn()
+
+    def handle_speed_event(self, event):
+        """T 切换极速模式，回车跳到结果；返回画面是否需要重绘"""
+        if event.type != pygame.KEYDOWN or self.state != c.GAME_STATES["RUNNING"]:
+            return False
+        if event.key == pygame.K_t:
+            self.turbo = not self.turbo
+            self.move_timer = 0
+            return True
+        if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            self.skip_to_end()
+            return True
+        return False
+
+    def handle_replay_event(self, event):
+        """
+        回放控制：P 暂停/继续，, / . 后退/前进一回合，[ / ] 后退/前进 REPLAY_SEEK_STEP 回合，
+        Home / End 跳到开头/结尾，ESC 退出；返回画面是否需要重绘
+        """
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == pygame.K_ESCAPE:
+            self.quit_game()
+            return False
+        if event.key == pygame.K_p:
+            self.paused = not self.paused
+            return True
+
+        seek = {
+            pygame.K_COMMA: self.turn - 1, pygame.K_PERIOD: self.turn + 1,
+            pygame.K_LEFTBRACKET: self.turn - c.REPLAY_SEEK_STEP, pygame.K_RIGHTBRACKET: self.turn + c.REPLAY_SEEK_STEP,
+            pygame.K_HOME: 0, pygame.K_END: len(self.sim.words),
+        }
+        if event.key not in seek:
+            return False
+        self.sim.seek(seek[event.key])
+        self.snapshot = Snapshot(self.sim)
+        self.state = c.GAME_STATES["GAME_OVER" if self.sim.over else "RUNNING"]
+        self.move_timer = 0
+        if self.camera.follow:
+            self.camera.keep_visible(self.thief_pos)
+        self.build_background()
+        return True
 
     # ================== 绘制地图 ==================
+    def build_background(self):
+        """
+        把视口内的障碍物与网格线绘制到缓存表面。障碍物不会移动，只有视口滚动或缩放时才需重建，
+        绘制量只与可见格子数有关，与地图总面积无关。
+        """
+        cam = self.camera
+        tile = cam.tile
+        visible = self.map_data.grid[cam.row:cam.row + cam.rows, cam.col:cam.col + cam.cols]
+        rows, cols = visible.shape
+
+        # 每格一个像素的颜色图，再按格子大小放大（surfarray 的坐标顺序为 (x, y)）
+        colors = np.where((visible == c.CELL_OBSTACLE)[..., None], c.BROWN, c.GREEN).astype(np.uint8)
+        pixels = pygame.surfarray.make_surface(colors.swapaxes(0, 1))
+        self.background = pygame.transform.scale(pixels, (cols * tile, rows * tile))
+
+        # 绘制网格线（每格四条边，与逐格描边效果一致）
+        width, height = cols * tile, rows * tile
+        for k in range(cols):
+            pygame.draw.line(self.background, GRID_LINE_COLOR, (k * tile, 0), (k * tile, height - 1))
+            pygame.draw.line(self.background, GRID_LINE_COLOR, (k * tile + tile - 1, 0), (k * tile + tile - 1, height - 1))
+        for k in range(rows):
+            pygame.draw.line(self.background, GRID_LINE_COLOR, (0, k * tile), (width - 1, k * tile))
+            pygame.draw.line(self.background, GRID_LINE_COLOR, (0, k * tile + tile - 1), (width - 1, k * tile + tile - 1))
+
+    def build_minimap(self):
+        """整张地图的缩略图，按固定像素数采样，大地图的构建成本也不随面积增长"""
+        samples = (np.arange(c.MINIMAP_SIZE) * self.size) // c.MINIMAP_SIZE
+        sampled = self.map_data.grid[np.ix_(samples, samples)]
+        colors = np.where((sampled == c.CELL_OBSTACLE)[..., None], c.BROWN, c.GREEN).astype(np.uint8)
+        self.minimap = pygame.surfarray.make_surface(colors.swapaxes(0, 1))
+
     def draw_grid(self):
-        # 将内部循环变量名从 c 改为 col
-        for row in range(c.GRID_SIZE):
-            for col in range(c.GRID_SIZE):
-                # 考虑顶部状态栏的偏移
-                rect = pygame.Rect(
-                    col * c.TILE_SIZE,
-                    c.MAP_OFFSET_Y + row * c.TILE_SIZE,
-                    c.TILE_SIZE,
-                    c.TILE_SIZE
-                )
-
-                if self.map_data.map[row][col] == '#':
-                    pygame.draw.rect(self.screen, c.BROWN, rect)
-                else:
-                    pygame.draw.rect(self.screen, c.GREEN, rect)
-
-                # 绘制网格线
-                pygame.draw.rect(self.screen, (50, 80, 50), rect, 1)
+        # 视口外的区域（地图小于视口时）保持黑色
+        self.screen.fill(c.BLACK, self.camera.view_rect)
+        self.screen.blit(self.background, self.camera.view_rect.topleft)
+
+    def draw_minimap(self):
+        """在视口右上角绘制小地图、角色位置与当前视口范围，返回其屏幕矩形；地图完全可见时不显示"""
+        if self.camera.shows_whole_map:
+            return None
+
+        cam = self.camera
+        scale = c.MINIMAP_SIZE / self.size
+        rect = pygame.Rect(0, 0, c.MINIMAP_SIZE, c.MINIMAP_SIZE)
+        rect.topright = (cam.view_rect.right - 8, cam.view_rect.top + 8)
+        self.screen.blit(self.minimap, rect)
+
+        def to_minimap(cell):
+            return (rect.x + int((cell[1] + 0.5) * scale), rect.y + int((cell[0] + 0.5) * scale))
+
+        for _, pos in self.police_positions:
+            pygame.draw.circle(self.screen, c.BLUE, to_minimap(pos), 2)
+        pygame.draw.circle(self.screen, c.RED, to_minimap(self.thief_pos), 3)
+
+        view = pygame.Rect(
+            rect.x + int(cam.col * scale), rect.y + int(cam.row * scale),
+            max(2, int(cam.cols * scale)), max(2, int(cam.rows * scale))
+        ).clip(rect)
+        pygame.draw.rect(self.screen, c.YELLOW, view, 1)
+        pygame.draw.rect(self.screen, c.WHITE, rect.inflate(2, 2), 1)
+        return rect.inflate(2, 2)
+
+    def cell_rect(self, cell):
+        return self.camera.cell_rect(cell)
+
+    def entity_cells(self):
+        """视口内需要绘制的角色，按格子分组：{(r, c): [("T",) 或 ("P", pid, 是否高亮), ...]}"""
+        cells = {}
+        if self.camera.is_visible(self.thief_pos):
+            cells[self.thief_pos] = [("T",)]
+        for i, (pid, pos) in enumerate(self.police_positions):
+            if not self.camera.is_visible(pos):
+                continue
+            # 如果是当前正在移动的警察，加粗边框或高亮
+            highlighted = (self.state == c.GAME_STATES["RUNNING"]
+                           and self.sub_step_state == "POLICE" and i == self.current_police_index)
+            cells.setdefault(pos, []).append(("P", pid, highlighted))
+        return cells
+
+    def draw_cell_items(self, cell, items):
+        rect = self.cell_rect(cell)
+        margin = rect.width // 7  # 默认 30 像素格子时留 4 像素边距
+        for item in items:
+            if item[0] == "T":
+                # 绘制小偷 (红色圆圈)
+                pygame.draw.circle(self.screen, c.RED, rect.center, max(1, rect.width // 2 - margin))
+                continue
+
+            # 绘制警察 (蓝色方块)
+            _, pid, highlighted = item
+            police_rect = rect.inflate(-2 * margin, -2 * margin)
+            if highlighted:
+                pygame.draw.rect(self.screen, c.YELLOW, police_rect.inflate(margin, margin), max(1, margin // 2))  # 黄色高亮框
+            pygame.draw.rect(self.screen, c.BLUE, police_rect)
+
+            # 绘制警察编号（格子太小时省略）
+            if rect.width >= c.TILE_SIZE:
+                id_text = render_text(self.font_small, str(pid), c.WHITE)
+                self.screen.blit(id_text, id_text.get_rect(center=police_rect.center))
 
     def draw_entities(self):
         if not self.map_data:
             return
 
-        # 绘制小偷 (红色圆圈)
-        tr, tc = self.map_data.thief_pos
-        center = (
-            tc * c.TILE_SIZE + c.TILE_SIZE // 2,
-            c.MAP_OFFSET_Y + tr * c.TILE_SIZE + c.TILE_SIZE // 2
-        )
-        pygame.draw.circle(self.screen, c.RED, center, c.TILE_SIZE // 2 - 4)
-
-        # 绘制警察 (蓝色方块)
-        for i, (pid, (pr, pc)) in enumerate(self.map_data.police_positions):
-            rect = pygame.Rect(pc * c.TILE_SIZE + 4, c.MAP_OFFSET_Y + pr * c.TILE_SIZE + 4, c.TILE_SIZE - 8, c.TILE_SIZE - 8)
-
-            # 如果是当前正在移动的警察，加粗边框或高亮
-            if self.state == c.GAME_STATES[
-                "RUNNING"] and self.sub_step_state == "POLICE" and i == self.current_police_index:
-                pygame.draw.rect(self.screen, c.YELLOW, rect.inflate(4, 4), 2)  # 黄色高亮框
-
-            pygame.draw.rect(self.screen, c.BLUE, rect)
-
-            # 绘制警察编号
-            id_text = self.font_small.render(str(pid), True, c.WHITE)
-            self.screen.blit(id_text, id_text.get_rect(center=rect.center))
+        # 视口边缘的格子可能只显示一部分，裁剪避免画到状态栏上
+        self.drawn_cells = self.entity_cells()
+        self.screen.set_clip(self.camera.view_rect)
+        for cell, items in self.drawn_cells.items():
+            self.draw_cell_items(cell, items)
+        self.screen.set_clip(None)
+
+    def draw_dirty_cells(self):
+        """只重绘与上一帧相比发生变化的格子，返回需要提交到屏幕的矩形"""
+        current = self.entity_cells()
+        dirty = [cell for cell in current.keys() | self.drawn_cells.keys()
+                 if current.get(cell) != self.drawn_cells.get(cell)]
+
+        rects = []
+        self.screen.set_clip(self.camera.view_rect)
+        for cell in dirty:
+            rect = self.cell_rect(cell)
+            # 先用缓存背景擦除该格（裁剪到视口内），再画上当前位于该格的角色
+            rect = rect.clip(self.camera.view_rect)
+            self.screen.blit(self.background, rect, area=rect.move(-self.camera.view_rect.x, -self.camera.view_rect.y))
+            self.draw_cell_items(cell, current.get(cell, []))
+            rects.append(rect)
+        self.screen.set_clip(None)
+        self.drawn_cells = current
+
+        # 小地图覆盖在格子之上，角色移动后需重绘
+        minimap_rect = self.draw_minimap()
+        if minimap_rect:
+            rects.append(minimap_rect)
+        return rects
+
+    def draw_full_frame(self):
+        self.screen.fill(c.BLACK)
+        self.draw_top_bar()
+        self.draw_grid()
+        self.draw_entities()
+        self.draw_minimap()
+        self.draw_bottom_bar()
 
     # ================== 结束提示 ==================
     def display_game_over(self):
@@ -391,18 +706,48 @@ class Game:
             (f"警察总步数: {self.total_steps}", c.WHITE, self.font_medium),
             (f"使用算法: {self.police_algorithm}", c.GRAY, self.font_small),
             ("", c.WHITE, self.font_small),  # 空行
-            ("按 [ESC] 或 [空格] 返回菜单", c.LIGHT_BLUE, self.font_small)
+            ("按 [Home] 重新播放，[ESC] 退出" if self.replaying else "按 [ESC] 或 [空格] 返回菜单",
+             c.LIGHT_BLUE, self.font_small)
         ]
 
         for text, color, font in results:
             if text == "":
                 start_y += 10
                 continue
-            surf = font.render(text, True, color)
+            surf = render_text(font, text, color)
             rect = surf.get_rect(center=(cx, start_y))
             self.screen.blit(surf, rect)
             start_y += 35
 
+    # ================== 视口控制 ==================
+    def handle_camera_event(self, event):
+        """方向键/WASD 滚动，滚轮或 +/- 缩放，F 切换跟随小偷，C 居中到小偷；返回视口是否变化"""
+        cam = self.camera
+        if event.type == pygame.MOUSEWHEEL:
+            return cam.zoom(1 if event.y > 0 else -1)
+        if event.type != pygame.KEYDOWN:
+            return False
+
+        scroll = {
+            pygame.K_UP: (-1, 0), pygame.K_w: (-1, 0),
+            pygame.K_DOWN: (1, 0), pygame.K_s: (1, 0),
+            pygame.K_LEFT: (0, -1), pygame.K_a: (0, -1),
+            pygame.K_RIGHT: (0, 1), pygame.K_d: (0, 1),
+        }
+        if event.key in scroll:
+            d_row, d_col = scroll[event.key]
+            return cam.scroll(d_row * c.SCROLL_STEP, d_col * c.SCROLL_STEP)
+        if event.key in (pygame.K_EQUALS, pygame.K_KP_PLUS):
+            return cam.zoom(1)
+        if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            return cam.zoom(-1)
+        if event.key == pygame.K_f:
+            cam.follow = not cam.follow
+            return cam.follow and cam.center_on(self.thief_pos)
+        if event.key == pygame.K_c:
+            return cam.center_on(self.thief_pos)
+        return False
+
     # ================== 游戏主循环 ==================
     def run(self):
         while self.running:
@@ -410,7 +755,11 @@ class Game:
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    self.running = False
+                    self.quit_game()
+
+                # 窗口被遮挡后恢复时需要整屏重绘
+                if event.type == pygame.WINDOWEXPOSED:
+                    self.needs_full_redraw = True
 
                 # 菜单状态下的事件
                 if self.state == c.GAME_STATES["MENU"]:
@@ -423,42 +772,98 @@ class Game:
                     ]:
                         btn.handle_event(event)
 
-                # 游戏结束状态下的事件：按键返回菜单
-                elif self.state == c.GAME_STATES["GAME_OVER"]:
+                # 极速模式与跳到结果
+                elif self.handle_speed_event(event):
+                    self.needs_full_redraw = True
+
+                # 回放控制（暂停、逐回合前进后退、跳转）
+                elif self.replaying and self.handle_replay_event(event):
+                    self.needs_full_redraw = True
+
+                # 对局中与结束后都可以滚动、缩放视口
+                elif self.handle_camera_event(event):
+                    self.build_background()
+                    self.needs_full_redraw = True
+
+                # 游戏结束状态下的事件：按键返回菜单（回放模式由 handle_replay_event 处理）
+                if self.state == c.GAME_STATES["GAME_OVER"] and not self.replaying:
                     if event.type == pygame.KEYDOWN:
                         if event.key in (pygame.K_ESCAPE, pygame.K_SPACE):
+                            self.stop_worker()
                             self.state = c.GAME_STATES["MENU"]
 
-            self.screen.fill(c.BLACK)
-
             if self.state == c.GAME_STATES["MENU"]:
+                # 菜单有悬停效果，每帧整屏重绘（文字表面已缓存）
+                self.screen.fill(c.BLACK)
                 self.draw_menu()
+                pygame.display.flip()
 
             elif self.state == c.GAME_STATES["RUNNING"]:
-                self.move_timer += dt
-                if self.move_timer >= self.move_interval:
-                    self.handle_turn()
-                    self.move_timer = 0
-
-                self.draw_top_bar()
-                self.draw_grid()
-                self.draw_entities()
-                self.draw_bottom_bar()
+                if not self.paused:
+                    self.move_timer += dt
+                moved = False
+                if self.turbo or (self.worker is not None and self.worker.skipping.is_set()):
+                    # 极速模式：在本帧的时间预算内推进尽可能多的子步骤（后台线程尚未算出时提前结束）
+                    deadline = time.perf_counter() + c.TURBO_FRAME_BUDGET / 1000
+                    while not self.paused and self.handle_turn():
+                        moved = True
+                        if time.perf_counter() >= deadline:
+                            break
+                elif self.move_timer >= self.move_interval:
+                    # 回放不做寻路，FPS 高于帧率时一帧内推进多个子步骤
+                    substeps = int(self.move_timer // self.move_interval) if self.replaying else 1
+                    for _ in range(substeps):
+                        moved = self.handle_turn() or moved
+                    # 后台线程尚未算出下一步时保留计时，下一帧再取
+                    if self.replaying:
+                        self.move_timer -= substeps * self.move_interval
+                    elif moved:
+                        self.move_timer = 0
+
+                # 跟随模式：小偷接近视口边缘时重新居中
+                if moved and self.camera.follow and self.camera.keep_visible(self.thief_pos):
+                    self.build_background()
+                    self.needs_full_redraw = True
+
+                if self.needs_full_redraw:
+                    self.draw_full_frame()
+                    pygame.display.flip()
+                    self.needs_full_redraw = False
+                elif moved and self.state == c.GAME_STATES["RUNNING"]:
+                    # 只提交状态栏与角色变化的格子
+                    self.draw_top_bar()
+                    top_rect = pygame.Rect(0, 0, c.SCREEN_WIDTH, c.TOP_BAR_HEIGHT)
+                    pygame.display.update([top_rect] + self.draw_dirty_cells())
 
             elif self.state == c.GAME_STATES["GAME_OVER"]:
-                # 游戏结束时，先画出最后的地图状态，再覆盖弹窗
-                self.draw_top_bar()
-                self.draw_grid()
-                self.draw_entities()
-                self.draw_bottom_bar()
-                self.display_game_over()
-
-            pygame.display.flip()
+                # 游戏结束画面是静态的，只在进入时绘制一次：先画出最后的地图状态，再覆盖弹窗
+                if self.needs_full_redraw:
+                    self.draw_full_frame()
+                    self.display_game_over()
+                    pygame.display.flip()
+                    self.needs_full_redraw = False
 
         pygame.quit()
 
 
 
 if __name__ == '__main__':
-    game = Game(c.GRID_SIZE, c.INITIAL_POLICE_COUNT)
+    parser = argparse.ArgumentParser(description=c.CAPTION)
+    parser.add_argument("--size", type=int, default=c.GRID_SIZE, help="地图边长（格），与窗口大小无关")
+    parser.add_argument("--assignment", choices=list(ASSIGNMENT_MODES), default="greedy", help="围堵格分配方式")
+    parser.add_argument("--thief", choices=list(THIEF_ALGORITHMS), default=next(iter(THIEF_ALGORITHMS)),
+                        help="小偷算法")
+    parser.add_argument("--connected", action="store_true", help="保证小偷与警察出生在同一连通分量")
+    parser.add_argument("--record", metavar="DIR", help="每局结束时把对局轨迹写入该目录")
+    parser.add_argument("--replay", metavar="PATH", help="回放轨迹文件（不做寻路，可暂停与跳转回合）")
+    parser.add_argument("--fps", type=float, help="回放速度（每秒子步骤数），可以是任意正数")
+    args = parser.parse_args()
+
+    if args.replay:
+        player = TracePlayer(args.replay)
+        game = Game(player.size, player.police_count)
+        game.start_replay(player, args.fps)
+    else:
+        game = Game(args.size, c.INITIAL_POLICE_COUNT, assignment=args.assignment, thief_algorithm=args.thief,
+                    connected=args.connected, record_dir=args.record)
     game.run()
\ No newline at end of file
@@ -1,63 +1,338 @@
 # GridMap 类
 import random
+from array import array
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from constants import (CELL_EMPTY, CELL_OBSTACLE, CELL_POLICE, CELL_THIEF, DISTANCE_CACHE_SIZE, HPA_MIN_MAP_SIZE,
+                       ZOBRIST_SEED)
+from hpa import ClusterGraph
+
+MOVES = ((0, 1), (0, -1), (1, 0), (-1, 0))  # 只允许上下左右移动，不允许斜对角移动
+
+
+# ================== Zobrist 哈希 ==================
+_zobrist_tables = {}
+
+def zobrist_table(size):
+    """
+    返回 (thief_keys, police_keys)：每个格子一个 64 位随机键，下标为 r*size+c。
+    使用独立的固定种子生成，不消耗全局随机状态，所有进程得到相同的键。
+    """
+    table = _zobrist_tables.get(size)
+    if table is None:
+        rng = random.Random(ZOBRIST_SEED + size)
+        n = size * size
+        table = ([rng.getrandbits(64) for _ in range(n)], [rng.getrandbits(64) for _ in range(n)])
+        _zobrist_tables[size] = table
+    return table
+
 
 class GridMap:
-    def __init__(self, size, police_count, obstacle_density):
+    def __init__(self, size, police_count, obstacle_density, connected=False):
+        """
+        :param connected: 为 True 时小偷与警察只在最大连通分量内出生，保证互相可达
+        """
+        self._init_fields(size)
+        self._initialize_map(police_count, obstacle_density, connected)
+
+        positions = self._place_entity(CELL_POLICE, count=police_count)
+        self.police_positions = [(i, pos) for i, pos in enumerate(positions)]
+
+    @classmethod
+    def from_layout(cls, obstacles, thief_pos, police_cells):
+        """
+        由已有布局构建地图（例如地图语料库中的记录），不消耗全局随机数
+        :param obstacles: (size, size) 布尔数组，True 为障碍物
+        :param thief_pos: 小偷出生点 (r, c)
+        :param police_cells: 警察出生点列表 [(r, c), ...]，按编号顺序
+        """
+        game_map = cls.__new__(cls)
+        game_map._init_fields(obstacles.shape[0])
+        game_map.grid[obstacles] = CELL_OBSTACLE
+        game_map._build_static_tables()
+        game_map.grid[thief_pos] = CELL_THIEF
+        game_map.thief_pos = thief_pos
+        for pos in police_cells:
+            game_map.grid[pos] = CELL_POLICE
+        game_map.police_positions = [(i, pos) for i, pos in enumerate(police_cells)]
+        return game_map
+
+    def _init_fields(self, size):
         self.size = size
-        self.map = [['.' for _ in range(size)] for _ in range(size)]    #. 代表空地，# 代表障碍物
+        self.grid = np.full((size, size), CELL_EMPTY, dtype=np.uint8)  # 取值见 constants 中的 CELL_*
         self.thief_pos = None       # 单个元组 (r, c)
         self.police_positions = []  # 带 ID 的列表：[(id, (r,c)), ...
-        self._initialize_map(police_count, obstacle_density)
-
-        positions = self._place_entity('P', count=police_count)
-        self.police_positions = [(i, pos) for i, pos in enumerate(positions)]
+        # CSR 邻接表（扁平下标 r*size+c）：格 i 的可通行邻居为 adj_indices[adj_indptr[i]:adj_indptr[i+1]]
+        self.adj_indptr = None
+        self.adj_indices = None
+        # 同一张表的 (indptr, indices) array('i') 缓冲区，adj_indptr/adj_indices 是共享其内存的 NumPy 视图；
+        # 纯 Python 搜索内核逐元素访问 array 比访问 NumPy 数组快
+        self.adjacency = (array("i"), array("i"))
+        self.components = None      # 连通分量标号：components[i] 为格 i 所在分量的代表格下标，障碍物为 -1
+        self._spawn_cells = []      # 尚未被占用、可作为出生点的空地下标
+        self._jump_tables = None    # JPS+ 跳跃表，首次使用时构建
+        self._cluster_graph = None  # HPA* 抽象图，首次使用时构建
+        self._distance_fields = OrderedDict()  # 距离场缓存：{源点: 扁平距离数组}，按 LRU 淘汰
+        self.planner_states = OrderedDict()    # 增量规划器：{警察预期所在格下标: 搜索状态}，由 utils 维护
+        self.thief_table = {}                  # 小偷博弈搜索的置换表：{局面 Zobrist 哈希: 搜索结果}，跨回合保留
 
     def _is_valid(self, r, c):
         return 0 <= r < self.size and 0 <= c < self.size
 
-    # 确保角色不会出生在墙里或彼此重叠
-    def _place_entity(self, entity_char, count=1):
+    def is_obstacle(self, r, c):
+        return self.grid[r, c] == CELL_OBSTACLE
+
+    # 确保角色不会出生在墙里或彼此重叠：从空地数组中无放回抽样，空地不足时报错而不是无限重试
+    def _place_entity(self, entity, count=1):
+        cells = self._spawn_cells
+        if len(cells) < count:
+            raise ValueError(f"可用空地只有 {len(cells)} 个，无法放置 {count} 个角色")
         positions = []
-        while len(positions) < count:
-            r = random.randint(0, self.size - 1)
-            c = random.randint(0, self.size - 1)
-            if self.map[r][c] == '.':
-                self.map[r][c] = entity_char
-                positions.append((r, c))
+        for _ in range(count):
+            i = random.randrange(len(cells))
+            cells[i], cells[-1] = cells[-1], cells[i]
+            r, c = divmod(cells.pop(), self.size)
+            self.grid[r, c] = entity
+            positions.append((r, c))
         return positions
 
-    def _initialize_map(self, police_count, obstacle_density):
+    def _initialize_map(self, police_count, obstacle_density, connected=False):
         num_obstacles = int(self.size * self.size * obstacle_density)
-        for _ in range(num_obstacles):
-            r, c = random.randint(0, self.size - 1), random.randint(0, self.size - 1)
-            self.map[r][c] = '#'
+        # 向量化放置障碍物（可重复落点，与逐个随机放置的分布一致）；随机源取自全局 random，保证可复现
+        rng = np.random.default_rng(random.getrandbits(64))
+        cells = rng.integers(0, self.size * self.size, size=num_obstacles)
+        self.grid.flat[cells] = CELL_OBSTACLE
+        self._build_static_tables()
+
+        # 出生点候选：全部空地，或只取最大连通分量（代表格下标最小者优先）
+        spawn = self.components >= 0
+        if connected and spawn.any():
+            labels, counts = np.unique(self.components[spawn], return_counts=True)
+            spawn = self.components == labels[np.argmax(counts)]
+        self._spawn_cells = _int_array(np.flatnonzero(spawn))
 
-        self.thief_pos = self._place_entity('T')[0]
+        self.thief_pos = self._place_entity(CELL_THIEF)[0]
 
     # A* 和 BFS 依赖算法
     def get_neighbors(self, pos):
-        r, c = pos
-        neighbors = []
-        MOVES = [(0, 1), (0, -1), (1, 0), (-1, 0)]  #只允许上下左右移动，不允许斜对角移动
-        for dr, dc in MOVES:
-            nr, nc = r + dr, c + dc
-            if self._is_valid(nr, nc) and self.map[nr][nc] != '#':
-                neighbors.append((nr, nc))
-        return neighbors
+        indptr, indices = self.adjacency
+        size = self.size
+        idx = pos[0] * size + pos[1]
+        return [divmod(n, size) for n in indices[indptr[idx]:indptr[idx + 1]]]
 
     # 移动前再次确认目标点不是墙
     def update_entity_pos(self, old_pos, new_pos):
-        if self._is_valid(new_pos[0], new_pos[1]) and self.map[new_pos[0]][new_pos[1]] == '#':
+        if self._is_valid(new_pos[0], new_pos[1]) and self.is_obstacle(new_pos[0], new_pos[1]):
             return old_pos
         return new_pos
 
     # 确保警察间不相撞
     def get_neighbors_with_blocked(self, pos, blocked_positions):
-        r, c = pos
-        neighbors = []
-        for dr, dc in [(0,1),(0,-1),(1,0),(-1,0)]:
-            nr, nc = r+dr, c+dc
-            if self._is_valid(nr, nc) and self.map[nr][nc] != '#' \
-               and (nr, nc) not in blocked_positions:
-                neighbors.append((nr, nc))
-        return neighbors
\ No newline at end of file
+        return [n for n in self.get_neighbors(pos) if n not in blocked_positions]
+
+    # ================== 静态邻接表 ==================
+    def _build_static_tables(self):
+        """障碍物布局确定后向量化构建 CSR 邻接表与连通分量，并清空依赖障碍物的缓存"""
+        size = self.size
+        n = size * size
+        free = self.grid.ravel() != CELL_OBSTACLE
+        rows, cols = np.divmod(np.arange(n, dtype=np.int32), size)
+
+        # candidates[i, k] 为格 i 沿 MOVES[k] 方向的邻居下标，-1 表示越界或障碍
+        candidates = np.full((n, len(MOVES)), -1, dtype=np.int32)
+        for k, (dr, dc) in enumerate(MOVES):
+            nr, nc = rows + dr, cols + dc
+            ok = free & (nr >= 0) & (nr < size) & (nc >= 0) & (nc < size)
+            target = nr * size + nc
+            ok[ok] = free[target[ok]]
+            candidates[ok, k] = target[ok]
+
+        valid = candidates >= 0
+        indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(valid.sum(axis=1), out=indptr[1:])
+        # 按行展开保持每格内部的 MOVES 顺序：右、左、下、上。
+        # adjacency 为搜索热循环使用的 array('i')（下标读取得到 Python int，速度与列表相同，每项 4 字节），
+        # adj_indptr / adj_indices 是同一块内存上的 NumPy 视图，供向量化代码使用，不另占内存
+        self.adjacency = (_int_array(indptr), _int_array(candidates[valid]))
+        self.adj_indptr = np.frombuffer(self.adjacency[0], dtype=np.int32)
+        self.adj_indices = np.frombuffer(self.adjacency[1], dtype=np.int32)
+        # 向右、向下的邻接关系恰好覆盖每条边一次
+        right = np.flatnonzero(candidates[:, 0] >= 0)
+        down = np.flatnonzero(candidates[:, 2] >= 0)
+        self.components = _label_components(
+            np.concatenate((right, down)), np.concatenate((candidates[right, 0], candidates[down, 2])), free)
+        self.invalidate_distance_cache()
+        self.planner_states.clear()
+        self.thief_table.clear()
+        self._jump_tables = None
+        self._cluster_graph = None
+
+    # ================== 连通性 ==================
+    def same_component(self, a, b):
+        """a 与 b 是否都可通行且处于同一连通分量"""
+        size = self.size
+        ca = self.components[a[0] * size + a[1]]
+        return ca >= 0 and ca == self.components[b[0] * size + b[1]]
+
+    def thief_reachable(self):
+        """是否至少有一名警察与小偷处于同一连通分量；否则无论多少回合都不可能抓捕"""
+        return any(self.same_component(pos, self.thief_pos) for _, pos in self.police_positions)
+
+    def build_occupancy_mask(self, blocked_positions=()):
+        """
+        构建占用掩码：bytearray，下标为 r*size+c，1 表示该格被其他角色占用。
+        搜索函数可 O(1) 判断占用且无需分配；调用方可在多次搜索之间原地增删占用位。
+        """
+        size = self.size
+        mask = bytearray(size * size)
+        for r, c in blocked_positions:
+            mask[r * size + c] = 1
+        return mask
+
+    # ================== JPS+ 跳跃表 ==================
+    def jump_tables(self):
+        """
+        返回 {移动方向: 扁平列表}，只依赖障碍物，首次调用时向量化构建。
+        表项为从该格（含）沿方向直线前进时第一个停止格的编码 dist*2+found：
+        found=1 表示停在跳点（强迫邻居，竖直方向还包括横向分支能找到跳点的格子），
+        found=0 表示撞墙前的最后一格；-1 表示该格本身不可通行。
+        """
+        if self._jump_tables is None:
+            free = self.grid != CELL_OBSTACLE
+            right = _scan_line(free, _forced(free))
+            left = _scan_line(free[:, ::-1], _forced(free[:, ::-1]))[:, ::-1]
+
+            # 竖直跳跃需要在横向分支能找到跳点的格子停下
+            found_right = (right >= 0) & (right & 1 == 1)
+            found_left = (left >= 0) & (left & 1 == 1)
+            branch = np.zeros_like(free)
+            branch[:, :-1] |= found_right[:, 1:]
+            branch[:, 1:] |= found_left[:, :-1]
+            down = _scan_line(free.T, _forced(free.T) | branch.T).T
+            up = _scan_line(free[::-1].T, _forced(free[::-1].T) | branch[::-1].T).T[::-1]
+
+            self._jump_tables = {
+                (0, 1): right.ravel().tolist(),
+                (0, -1): left.ravel().tolist(),
+                (1, 0): down.ravel().tolist(),
+                (-1, 0): up.ravel().tolist(),
+            }
+        return self._jump_tables
+
+    def cluster_graph(self):
+        """返回本地图的 HPA* 抽象图（簇、入口与簇内距离缓存），只依赖障碍物，首次调用时构建"""
+        if self._cluster_graph is None:
+            self._cluster_graph = ClusterGraph(self)
+        return self._cluster_graph
+
+    # ================== 距离场缓存 ==================
+    def invalidate_distance_cache(self):
+        """障碍物布局改变后必须调用，清空所有已缓存的距离场"""
+        self._distance_fields.clear()
+
+    def distance_field(self, source):
+        """
+        返回以 source 为源点的 BFS 距离场（扁平列表，下标为 r*size+c，-1 表示不可达）。
+        距离场只依赖障碍物，首次使用时构建，之后按 LRU 缓存复用。
+        """
+        field = self._distance_fields.get(source)
+        if field is not None:
+            self._distance_fields.move_to_end(source)
+            return field
+
+        size = self.size
+        field = [-1] * (size * size)
+        sr, sc = source
+        field[sr * size + sc] = 0
+        indptr, indices = self.adjacency
+        queue = deque([sr * size + sc])
+        while queue:
+            current = queue.popleft()
+            next_dist = field[current] + 1
+            for k in range(indptr[current], indptr[current + 1]):
+                nxt = indices[k]
+                if field[nxt] < 0:
+                    field[nxt] = next_dist
+                    queue.append(nxt)
+
+        self._distance_fields[source] = field
+        if len(self._distance_fields) > DISTANCE_CACHE_SIZE:
+            self._distance_fields.popitem(last=False)
+        return field
+
+    def distance(self, a, b):
+        """
+        返回 a 到 b 的最短路径长度，不可达时返回 None。
+        地图是无向的，因此以 b 为源点查表：同一目标格的距离场可被所有警察共享。
+        大地图（边长不小于 HPA_MIN_MAP_SIZE）改用 HPA* 抽象图上的近似路线长度。
+        """
+        if a == b:
+            return 0
+        # 不在同一连通分量时直接判定不可达，不必展开任何搜索
+        if not self.same_component(a, b):
+            return None
+        if self.size >= HPA_MIN_MAP_SIZE:
+            return self.cluster_graph().distance(a, b)
+        d = self.distance_field(b)[a[0] * self.size + a[1]]
+        return d if d >= 0 else None
+
+
+# ================== 连通分量（并查集） ==================
+def _label_components(u, v, free):
+    """
+    向量化并查集：每轮把每条跨分量边两端的根中较大者挂到较小者上（同一根取最小），
+    再反复指针跳跃完成路径压缩，直到没有跨分量的边。指针只会指向更小的下标，不会成环。
+    :param u, v: 边的两端（扁平下标）
+    :param free: 可通行掩码
+    :return: 每个格子所在分量的代表格（分量内最小下标），障碍物为 -1
+    """
+    parent = np.arange(len(free), dtype=np.int64)
+    u = u.astype(np.int64)
+    v = v.astype(np.int64)
+    while len(u):
+        ru, rv = parent[u], parent[v]
+        crossing = ru != rv
+        u, v, ru, rv = u[crossing], v[crossing], ru[crossing], rv[crossing]
+        if not len(u):
+            break
+        np.minimum.at(parent, np.maximum(ru, rv), np.minimum(ru, rv))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    parent[~free] = -1
+    return parent.astype(np.int32)
+
+
+def _int_array(values):
+    """整数 NumPy 数组转为 array('i')"""
+    result = array("i")
+    result.frombytes(np.ascontiguousarray(values, dtype=np.int32).tobytes())
+    return result
+
+
+# ================== JPS+ 跳跃表构建（按行向右扫描，其余方向通过翻转/转置复用） ==================
+def _forced(free):
+    """向右移动时的强迫邻居格：上（下）方可通行而其左上（左下）方不可通行"""
+    padded = np.zeros((free.shape[0] + 2, free.shape[1] + 1), dtype=bool)
+    padded[1:-1, 1:] = free
+    up, up_behind = padded[:-2, 1:], padded[:-2, :-1]
+    down, down_behind = padded[2:, 1:], padded[2:, :-1]
+    return free & ((up & ~up_behind) | (down & ~down_behind))
+
+def _scan_line(free, stop):
+    """逐列从右向左递推每格向右的停止编码 dist*2+found，每次处理整列"""
+    rows, cols = free.shape
+    code = np.full((rows, cols), -1, dtype=np.int32)
+    following = np.full(rows, -1, dtype=np.int32)
+    for col in range(cols - 1, -1, -1):
+        current = np.where(following >= 0, following + 2, 0)
+        current = np.where(stop[:, col], 1, current)
+        current = np.where(free[:, col], current, -1)
+        code[:, col] = current
+        following = current
+    return code
+
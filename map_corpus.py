@@ -0,0 +1,110 @@
+# 地图语料库：预先生成 N 张地图及出生点，写入定长记录的二进制文件，实验中按下标内存映射读取
+import argparse
+import os
+import random
+import struct
+
+import numpy as np
+
+import constants as c
+from map import GridMap
+
+# 文件头：魔数、版本、地图边长、警察数量、标志位（bit0 = 保证连通）、地图数量、障碍物密度、每条记录字节数
+HEADER = struct.Struct("<8sHHHHIfI4x")
+MAGIC = b"CTTMAPS\0"
+VERSION = 1
+FLAG_CONNECTED = 1
+
+
+def record_dtype(size, police_count):
+    """
+    每张地图一条定长记录：按位打包的障碍物网格（行优先，1 为障碍物）、小偷出生格与各警察出生格的扁平下标
+    """
+    return np.dtype([
+        ("grid", np.uint8, ((size * size + 7) // 8,)),
+        ("thief", "<u4"),
+        ("police", "<u4", (police_count,)),
+    ])
+
+
+def build_corpus(path, count, size, police_count, obstacle_density, seed=0, connected=False):
+    """
+    生成 count 张地图写入 path。第 i 张地图由种子 "seed|i" 生成，同样的参数总是得到同样的文件。
+    :return: 写入的地图数量
+    """
+    dtype = record_dtype(size, police_count)
+    records = np.zeros(count, dtype=dtype)
+    for i in range(count):
+        random.seed(f"{seed}|{i}")
+        game_map = GridMap(size, police_count, obstacle_density, connected)
+        records[i]["grid"] = np.packbits(game_map.grid.ravel() == c.CELL_OBSTACLE)
+        records[i]["thief"] = game_map.thief_pos[0] * size + game_map.thief_pos[1]
+        records[i]["police"] = [r * size + col for _, (r, col) in game_map.police_positions]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # 先写临时文件再改名，并行读取的进程不会看到写了一半的文件
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size, police_count, FLAG_CONNECTED if connected else 0,
+                            count, obstacle_density, dtype.itemsize))
+        records.tofile(f)
+    os.replace(partial, path)
+    return count
+
+
+# --- MapCorpus 类 ---
+class MapCorpus:
+    def __init__(self, path):
+        """
+        内存映射打开地图语料库：只读取文件头，记录在 load 时按需从映射中解码，多个进程共享同一份页缓存
+        :param path: build_corpus 生成的文件
+        """
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} 不是地图语料库文件")
+        magic, version, size, police_count, flags, count, density, stride = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是地图语料库文件（或版本不兼容）")
+
+        self.path = path
+        self.size = size
+        self.police_count = police_count
+        self.connected = bool(flags & FLAG_CONNECTED)
+        self.obstacle_density = density
+        dtype = record_dtype(size, police_count)
+        if dtype.itemsize != stride:
+            raise ValueError(f"{path} 的记录长度 {stride} 与文件头不符")
+        self.records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+
+    def __len__(self):
+        return len(self.records)
+
+    def load(self, index):
+        """解码第 index 张地图，返回新的 GridMap（对局会修改地图状态，每次调用都重新构建）"""
+        record = self.records[index]
+        size = self.size
+        obstacles = np.unpackbits(record["grid"], count=size * size).astype(bool).reshape(size, size)
+        police = [divmod(int(idx), size) for idx in record["police"]]
+        return GridMap.from_layout(obstacles, divmod(int(record["thief"]), size), police)
+
+
+def corpus_path(directory, police_count, obstacle_density):
+    """实验用语料库目录中，每组 (警察数, 密度) 一个文件"""
+    return os.path.join(directory, f"maps_P{police_count}_D{obstacle_density}.bin")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成地图语料库")
+    parser.add_argument("path", help="输出文件")
+    parser.add_argument("--maps", type=int, default=100, help="地图数量")
+    parser.add_argument("--size", type=int, default=c.GRID_SIZE, help="地图边长（格）")
+    parser.add_argument("--police", type=int, default=c.INITIAL_POLICE_COUNT, help="警察数量")
+    parser.add_argument("--density", type=float, default=c.DENSITY_OPTIONS[c.DEFAULT_DENSITY_INDEX], help="障碍物密度")
+    parser.add_argument("--seed", type=int, default=0, help="语料库种子")
+    parser.add_argument("--connected", action="store_true", help="保证小偷与警察出生在同一连通分量")
+    args = parser.parse_args()
+    build_corpus(args.path, args.maps, args.size, args.police, args.density, args.seed, args.connected)
+    print(f"已生成 {args.maps} 张地图: {args.path}")
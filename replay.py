@@ -0,0 +1,193 @@
+# 对局轨迹：录制时每回合只记录各角色的一步位移（定长整数按位打包），回放时直接套用位移，不做任何寻路
+import json
+import os
+import struct
+from array import array
+
+import numpy as np
+
+from constants import CELL_OBSTACLE, TRACE_KEYFRAME_INTERVAL
+from map import GridMap, MOVES
+
+# 位移编码：0 为原地不动，k 为 MOVES[k-1]；每个角色占 MOVE_BITS 位，警察依次在低位，小偷在最高位
+DELTAS = ((0, 0),) + MOVES
+_CODES = {delta: code for code, delta in enumerate(DELTAS)}
+MOVE_BITS = 3
+MOVE_MASK = (1 << MOVE_BITS) - 1
+MAX_ENTITIES = 32 // MOVE_BITS  # 一个 uint32 最多容纳的角色数（警察 + 小偷）
+
+# 文件头：魔数、版本、地图边长、警察数量、关键帧间隔、位移字数、关键帧数、元数据字节数
+HEADER = struct.Struct("<8sHHHHIII")
+MAGIC = b"CTTRACE\0"
+VERSION = 1
+
+
+def _positions(game_map):
+    """[小偷, 警察 0, 警察 1, ...] 的扁平下标"""
+    size = game_map.size
+    cells = [game_map.thief_pos] + [pos for _, pos in game_map.police_positions]
+    return [r * size + c for r, c in cells]
+
+
+def _padded(nbytes):
+    """各数据段按 4 字节对齐"""
+    return (nbytes + 3) // 4 * 4
+
+
+# --- TraceRecorder 类 ---
+class TraceRecorder:
+    __slots__ = ("size", "police_count", "obstacles", "words", "word", "keyframes", "metadata")
+
+    def __init__(self, game_map, metadata=None):
+        """
+        开局时记录地图与初始位置，之后由 Simulation 在每个子步骤调用 move、每回合结束调用 end_turn
+        :param metadata: 写入轨迹文件的附加信息（种子、算法等），需可 JSON 序列化
+        """
+        self.size = game_map.size
+        self.police_count = len(game_map.police_positions)
+        if self.police_count + 1 > MAX_ENTITIES:
+            raise ValueError(f"轨迹最多记录 {MAX_ENTITIES - 1} 名警察")
+        self.obstacles = np.packbits(game_map.grid.ravel() == CELL_OBSTACLE)
+        self.words = array("I")  # 每个完整回合一个字
+        self.word = 0            # 当前回合已记录的位移
+        # 关键帧：每 TRACE_KEYFRAME_INTERVAL 回合一行 [警察总步数, 小偷, 警察...]，第 0 行为开局
+        self.keyframes = array("I", [0] + _positions(game_map))
+        self.metadata = dict(metadata or {})
+
+    def move(self, entity, old, new):
+        """记录一步移动；entity 为警察序号，小偷为 police_count"""
+        if old != new:
+            self.word |= _CODES[(new[0] - old[0], new[1] - old[1])] << (MOVE_BITS * entity)
+
+    def end_turn(self, game_map, total_steps):
+        self.words.append(self.word)
+        self.word = 0
+        if len(self.words) % TRACE_KEYFRAME_INTERVAL == 0:
+            self.keyframes.append(total_steps)
+            self.keyframes.extend(_positions(game_map))
+
+    def save(self, path, turns, total_steps, reason, overwrite=True):
+        """
+        写入轨迹文件；对局在回合中途结束时，未完成回合的位移作为最后一个字写入
+        :param overwrite: 为 False 时以独占方式创建，path 已存在则抛出 FileExistsError
+        """
+        words = array("I", self.words)
+        if self.word:
+            words.append(self.word)
+        metadata = dict(self.metadata, turns=turns, total_steps=total_steps, reason=reason)
+        blob = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+        row = self.police_count + 2
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb" if overwrite else "xb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.size, self.police_count, TRACE_KEYFRAME_INTERVAL,
+                                len(words), len(self.keyframes) // row, len(blob)))
+            f.write(self.obstacles.tobytes().ljust(_padded(len(self.obstacles)), b"\0"))
+            f.write(words.tobytes())
+            f.write(self.keyframes.tobytes())
+            f.write(blob)
+
+
+# --- TracePlayer 类 ---
+class TracePlayer:
+    def __init__(self, path):
+        """
+        内存映射打开轨迹文件并回放，对外提供与 Simulation 相同的状态属性与 step()，界面代码可直接复用；
+        seek(turn) 从不晚于目标回合的最近关键帧出发，最多套用 TRACE_KEYFRAME_INTERVAL 回合的位移
+        """
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, size, police_count, interval, word_count, keyframe_count, blob_len = \
+            HEADER.unpack(bytes(data[:HEADER.size]))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是对局轨迹文件（或版本不兼容）")
+
+        offset = HEADER.size
+        grid_bytes = (size * size + 7) // 8
+        obstacles = np.unpackbits(data[offset:offset + grid_bytes], count=size * size).astype(bool)
+        offset += _padded(grid_bytes)
+        self.words = data[offset:offset + 4 * word_count].view("<u4")
+        offset += 4 * word_count
+        row = police_count + 2
+        self.keyframes = data[offset:offset + 4 * keyframe_count * row].view("<u4").reshape(keyframe_count, row)
+        offset += 4 * keyframe_count * row
+        self.metadata = json.loads(bytes(data[offset:offset + blob_len]).decode("utf-8"))
+
+        self.size = size
+        self.police_count = police_count
+        self.interval = interval
+        self.final_turn = self.metadata["turns"]
+        start = self.keyframes[0].tolist()
+        self.map_data = GridMap.from_layout(
+            obstacles.reshape(size, size), divmod(start[1], size), [divmod(idx, size) for idx in start[2:]])
+        self.seek(0)
+
+    def _finish(self):
+        self.over = True
+        self.game_over_reason = self.metadata["reason"]
+
+    # ================== 定位 ==================
+    def seek(self, turn):
+        """跳到第 turn 回合开始时的局面（超出范围时取最近的端点）"""
+        turn = max(0, min(turn, len(self.words)))
+        k = min(turn // self.interval, len(self.keyframes) - 1)
+        steps, thief, *police = self.keyframes[k].tolist()
+        size = self.size
+        thief = divmod(thief, size)
+        police = [divmod(idx, size) for idx in police]
+
+        shift = MOVE_BITS * self.police_count
+        for word in self.words[k * self.interval:turn].tolist():
+            for i in range(self.police_count):
+                dr, dc = DELTAS[(word >> (MOVE_BITS * i)) & MOVE_MASK]
+                if dr or dc:
+                    police[i] = (police[i][0] + dr, police[i][1] + dc)
+                    steps += 1
+            dr, dc = DELTAS[(word >> shift) & MOVE_MASK]
+            thief = (thief[0] + dr, thief[1] + dc)
+
+        self.map_data.thief_pos = thief
+        self.map_data.police_positions = list(enumerate(police))
+        self.turn = min(turn, self.final_turn)
+        self.total_steps = steps
+        self.current_police_index = 0
+        self.sub_step_state = "POLICE"
+        self.over = False
+        self.game_over_reason = ""
+        if turn >= len(self.words):
+            self._finish()
+
+    # ================== 回放 ==================
+    def step(self):
+        """推进一个子步骤：与 Simulation.step 相同的顺序，位移直接取自轨迹"""
+        if self.over:
+            return
+        word = int(self.words[self.turn])
+
+        if self.sub_step_state == "POLICE":
+            i = self.current_police_index
+            pid, (r, c) = self.map_data.police_positions[i]
+            dr, dc = DELTAS[(word >> (MOVE_BITS * i)) & MOVE_MASK]
+            if dr or dc:
+                self.map_data.police_positions[i] = (pid, (r + dr, c + dc))
+                self.total_steps += 1
+            if (r + dr, c + dc) == self.map_data.thief_pos:
+                self._finish()
+                return
+            self.current_police_index += 1
+            if self.current_police_index >= self.police_count:
+                self.current_police_index = 0
+                self.sub_step_state = "THIEF"
+
+        else:
+            r, c = self.map_data.thief_pos
+            dr, dc = DELTAS[(word >> (MOVE_BITS * self.police_count)) & MOVE_MASK]
+            self.map_data.thief_pos = (r + dr, c + dc)
+            if any(pos == self.map_data.thief_pos for _, pos in self.map_data.police_positions):
+                self._finish()
+                return
+            self.turn += 1
+            self.sub_step_state = "POLICE"
+            if self.turn >= len(self.words):
+                self._finish()
@@ -0,0 +1,177 @@
+# 逆向分析（Retrograde Analysis）：对小地图的 (小偷, 各警察位置) 联合状态空间求精确博弈解
+import hashlib
+import itertools
+import os
+import numpy as np
+
+from constants import CELL_OBSTACLE, RETRO_CACHE_DIR, RETRO_CHUNK_SIZE, RETRO_MAX_STATES
+from map import MOVES
+
+
+# --- CaptureTable 类 ---
+class CaptureTable:
+    def __init__(self, game_map, police_count, cache_dir=RETRO_CACHE_DIR):
+        """
+        求出一张地图上每个警察回合开始时的局面在双方最优策略下的抓捕步数，结果表以 .npy 内存映射保存，
+        同一张地图再次使用时直接映射已有文件。
+        - 状态编码：可通行格重新编号为 0..n-1，警察按编号顺序排成元组，以 n 进制编码为 0..n^k-1
+          （含重复格子的元组不是合法局面，不参与求解），状态下标 = 小偷格 * n^k + 警察元组编码；
+        - 规则与 Simulation 一致：警察走到小偷所在格即抓捕；小偷可移动到不被警察占据的邻格或原地不动；
+          警察按编号依次移动一步或原地，不能进入其他警察此刻所在的格子（编号在后的警察尚未离开原格）。
+        :param game_map: GridMap 实例
+        :param police_count: 警察数量
+        :param cache_dir: 结果表目录，None 表示只在内存中求解
+        """
+        free = np.flatnonzero(game_map.grid.ravel() != CELL_OBSTACLE)
+        n, k = len(free), police_count
+        self.size = game_map.size
+        self.police_count = k
+        self.tuple_count = n ** k
+        self.state_count = n * self.tuple_count
+        if self.state_count > RETRO_MAX_STATES:
+            raise ValueError(f"状态数 {self.state_count} 超过上限 RETRO_MAX_STATES={RETRO_MAX_STATES}")
+
+        # 扁平格子下标 -> 可通行格编号
+        self.position = np.full(self.size * self.size, -1, dtype=np.int64)
+        self.position[free] = np.arange(n)
+        # 各警察的位权：警察 0 在最高位
+        self.radix = n ** np.arange(k - 1, -1, -1, dtype=np.int64)
+
+        path = None
+        if cache_dir is not None:
+            key = hashlib.blake2b(np.int64(self.size).tobytes() + free.astype(np.int64).tobytes(),
+                                  digest_size=12).hexdigest()
+            path = os.path.join(cache_dir, f"{key}_k{k}_ordered.npy")
+        if path is not None and os.path.exists(path):
+            self.table = np.load(path, mmap_mode="r")
+        else:
+            self.table = self._solve(game_map, free, path)
+
+    # ================== 状态编码 ==================
+    def encode(self, police):
+        """police 为 (m, k) 的可通行格编号数组，第 j 列为警察 j；返回 n 进制编码"""
+        return police @ self.radix
+
+    def _tuples(self, n):
+        """按编码顺序排列的全部警察元组，(n^k, k)"""
+        return np.array(list(itertools.product(range(n), repeat=self.police_count)),
+                        dtype=np.int64).reshape(-1, self.police_count)
+
+    # ================== 求解 ==================
+    def _solve(self, game_map, free, path):
+        """
+        逆向广度优先：从“警察可立即抓捕”的局面出发，逐层回推。
+        - 警察回合局面的步数 = 1 + 所有合法的依次移动后小偷回合局面步数的最小值；
+        - 小偷回合局面的步数 = 所有小偷走法后警察回合局面步数的最大值，用剩余走法计数器判断是否全部必败。
+        结果中 0 表示小偷可以无限期逃脱。
+        """
+        n, k, m = len(free), self.police_count, self.tuple_count
+        total = self.state_count
+
+        # moves[i, d] 为编号 i 的格子沿第 d 个方向走一步到达的格子编号（第 0 列为原地不动），-1 表示无效；
+        # 按方向而不是按邻居顺序排列，同一列内不同格子的落点互不相同
+        moves = np.full((n, len(MOVES) + 1), -1, dtype=np.int64)
+        moves[:, 0] = np.arange(n)
+        rows, cols = np.divmod(free, self.size)
+        for d, (dr, dc) in enumerate(MOVES, start=1):
+            nr, nc = rows + dr, cols + dc
+            inside = (nr >= 0) & (nr < self.size) & (nc >= 0) & (nc < self.size)
+            moves[inside, d] = self.position[nr[inside] * self.size + nc[inside]]
+
+        tuples = self._tuples(n)
+        occupied = np.zeros((m, n), dtype=bool)
+        occupied[np.arange(m)[:, None], tuples] = True
+        valid = occupied.sum(axis=1) == k  # 警察两两不重叠
+
+        if path is not None:
+            # 先写入本进程的临时文件，求解完成后再改名，其他进程不会映射到写了一半的结果表
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f"{path}.{os.getpid()}.tmp"
+            police_depth = np.lib.format.open_memmap(partial, mode="w+", dtype=np.int16, shape=(total,))
+            police_depth[:] = 0
+        else:
+            police_depth = np.zeros(total, dtype=np.int16)
+        thief_depth = np.zeros(total, dtype=np.int16)
+        remaining = np.zeros(total, dtype=np.uint8)  # 小偷回合局面中尚未判定必败的走法数
+
+        # 初始化计数器与第 1 层（警察与小偷相邻，立即抓捕）
+        frontier = []
+        for t in range(n):
+            block = slice(t * m, (t + 1) * m)
+            targets = moves[t][moves[t] >= 0]
+            remaining[block] = (~occupied[:, targets]).sum(axis=1)
+            adjacent = occupied[:, targets[1:]].any(axis=1) & ~occupied[:, t] & valid
+            police_depth[block][adjacent] = 1
+            frontier.append(np.flatnonzero(adjacent) + t * m)
+        frontier = np.concatenate(frontier)
+
+        depth = 1
+        while len(frontier):
+            # 小偷层：警察回合局面 (t', S) 必败，其前驱小偷回合局面 (t, S) 的剩余走法数减一；
+            # 走法可逆，前驱的小偷格即 t' 沿各方向走一步的落点，同一方向内互不重复
+            thief_cell, code = np.divmod(frontier, m)
+            lost = []
+            for slot in range(len(MOVES) + 1):
+                t = moves[thief_cell, slot]
+                ok = t >= 0
+                ok[ok] = ~occupied[code[ok], t[ok]]
+                states = t[ok] * m + code[ok]
+                remaining[states] -= 1
+                lost.append(states[(remaining[states] == 0) & (thief_depth[states] == 0)])
+            lost = np.concatenate(lost)
+            thief_depth[lost] = depth
+
+            # 警察层：小偷回合局面 (t, S') 必败，能依次移动到 S' 的警察回合局面 (t, S) 在 depth+1 步内抓捕；
+            # 每个局面最多展开 5^k 种移动组合，分块处理以限制内存
+            won = [self._police_predecessors(lost[i:i + RETRO_CHUNK_SIZE], tuples, moves, police_depth, depth + 1)
+                   for i in range(0, len(lost), RETRO_CHUNK_SIZE)]
+            frontier = np.unique(np.concatenate(won)) if won else np.empty(0, dtype=np.int64)
+            depth += 1
+
+        if path is not None:
+            police_depth.flush()
+            del police_depth
+            os.replace(partial, path)
+            return np.load(path, mmap_mode="r")
+        return police_depth
+
+    def _police_predecessors(self, lost, tuples, moves, police_depth, depth):
+        """
+        展开一批小偷回合局面的前驱警察回合局面，把尚未判定的标记为 depth 并返回。
+        警察 j 从 c_j 走到 c'_j 时，编号在后的警察 i 仍在原格 c_i，因此前驱须满足 c_i != c'_j（i > j）；
+        编号在前的警察已经离开，可以跟进其原格。逐名警察展开，无效（撞墙、位于小偷格、与前面的警察重叠、
+        占着前面警察要进入的格子）的分支尽早丢弃。
+        """
+        thief_cell, code = np.divmod(lost, self.tuple_count)
+        police = tuples[code]
+        rows = np.arange(len(lost))
+        cells = np.empty((len(lost), 0), dtype=np.int64)
+        for j in range(self.police_count):
+            expanded_rows, expanded_cells = [], []
+            for slot in range(len(MOVES) + 1):
+                cell = moves[police[rows, j], slot]
+                ok = (cell >= 0) & (cell != thief_cell[rows])
+                for previous in range(j):
+                    ok &= (cell != cells[:, previous]) & (cell != police[rows, previous])
+                expanded_rows.append(rows[ok])
+                expanded_cells.append(np.column_stack((cells[ok], cell[ok])))
+            rows = np.concatenate(expanded_rows)
+            cells = np.concatenate(expanded_cells)
+
+        states = thief_cell[rows] * self.tuple_count + self.encode(cells)
+        states = states[police_depth[states] == 0]
+        police_depth[states] = depth
+        return states
+
+    # ================== 查询 ==================
+    def capture_turns(self, thief_pos, police_positions):
+        """
+        返回警察回合开始时的最优抓捕回合数（与 Simulation.turn 同一计数：0 表示本回合即可抓捕），
+        小偷能无限期逃脱时返回 None
+        :param police_positions: [(pid, (r, c)), ...]，按 Simulation 的移动顺序排列
+        """
+        size = self.size
+        t = self.position[thief_pos[0] * size + thief_pos[1]]
+        police = self.position[[r * size + c for _, (r, c) in police_positions]][None, :]
+        depth = int(self.table[t * self.tuple_count + self.encode(police)[0]])
+        return depth - 1 if depth > 0 else None
@@ -0,0 +1,331 @@
+# 纯逻辑模拟核心：不依赖 pygame，可在无界面实验与子进程中复用
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import constants as c
+from map import GridMap, zobrist_table
+from replay import TraceRecorder
+from utils import cooperative_police_move, POLICE_ALGORITHMS, THIEF_ALGORITHMS
+
+
+# --- StalemateDetector 类 ---
+class StalemateDetector:
+    __slots__ = ("window", "_seen", "_order")
+
+    def __init__(self, window=c.STALEMATE_HISTORY_SIZE):
+        """
+        以状态哈希判断局面是否重复：集合索引 O(1) 查询，环形队列淘汰最旧状态
+        :param window: 记住的最近状态数，None 表示不限
+        """
+        self.window = window
+        self._seen = set()
+        self._order = deque()
+
+    def clear(self):
+        self._seen.clear()
+        self._order.clear()
+
+    def check(self, state_hash):
+        """状态已出现过返回 True；否则记录该状态并返回 False"""
+        if state_hash in self._seen:
+            return True
+        self._seen.add(state_hash)
+        if self.window is not None:
+            self._order.append(state_hash)
+            if len(self._order) > self.window:
+                self._seen.discard(self._order.popleft())
+        return False
+
+
+# --- Simulation 类 ---
+class Simulation:
+    __slots__ = (
+        "size", "police_count", "obstacle_density", "police_algorithm", "assignment",
+        "thief_algorithm", "thief_time_budget", "connected",
+        "map_data", "over", "turn", "total_steps", "game_over_reason",
+        "current_police_index", "sub_step_state", "police_plan",
+        "state_hash", "stalemate", "search_time", "record", "trace",
+    )
+
+    def __init__(self, size, police_count=c.INITIAL_POLICE_COUNT,
+                 obstacle_density=c.DENSITY_OPTIONS[c.DEFAULT_DENSITY_INDEX],
+                 police_algorithm=next(iter(POLICE_ALGORITHMS)), assignment="greedy",
+                 thief_algorithm=next(iter(THIEF_ALGORITHMS)), thief_time_budget=None, connected=False,
+                 record=False):
+        """
+        初始化模拟实例（尚未生成地图，需调用 reset 开局）
+        :param size: 地图尺寸
+        :param police_count: 警察数量
+        :param obstacle_density: 障碍物密度
+        :param police_algorithm: 警察算法名称，见 POLICE_ALGORITHMS 与 TEAM_ALGORITHMS
+        :param assignment: 围堵格分配方式，见 ASSIGNMENT_MODES
+        :param thief_algorithm: 小偷算法名称，见 THIEF_ALGORITHMS
+        :param thief_time_budget: 小偷每步的搜索时间预算（秒），None 表示不限时（实验需要可复现的结果）
+        :param connected: 是否保证小偷与警察出生在同一连通分量
+        :param record: 是否记录对局轨迹（见 replay.TraceRecorder），对局结束后用 save_trace 写入文件
+        """
+        self.size = size
+        self.police_count = police_count
+        self.obstacle_density = obstacle_density
+        self.police_algorithm = police_algorithm
+        self.assignment = assignment
+        self.thief_algorithm = thief_algorithm
+        self.thief_time_budget = thief_time_budget
+        self.connected = connected
+
+        self.map_data = None
+        self.over = False
+        self.turn = 0
+        self.total_steps = 0
+        self.game_over_reason = ""
+        self.current_police_index = 0  # 追踪当前移动的警察编号
+        self.sub_step_state = "POLICE"  # 当前子阶段：POLICE 或 THIEF
+        self.police_plan = []  # 本回合警察团队的移动计划：[(pid, next_pos), ...]
+        self.state_hash = 0  # (小偷位置, 警察位置集合) 的 Zobrist 哈希，随移动增量更新
+        self.stalemate = StalemateDetector(c.STALEMATE_HISTORY_SIZE)
+        self.search_time = 0.0  # 本局警察团队规划累计耗时（秒），用于比较各算法的搜索成本
+        self.record = record
+        self.trace = None  # 本局的 TraceRecorder，未开启记录时为 None
+
+    def reset(self, seed=None, police_algorithm=None, obstacle_density=None, police_count=None, assignment=None,
+              thief_algorithm=None, game_map=None):
+        """
+        开始新的一局，同一实例可在多轮实验间反复使用
+        :param seed: 随机种子，None 表示沿用当前全局随机状态
+        :param game_map: 预先构建的地图（例如来自地图语料库），None 表示按当前参数随机生成
+        """
+        if police_algorithm: self.police_algorithm = police_algorithm
+        if obstacle_density is not None: self.obstacle_density = obstacle_density
+        if police_count: self.police_count = police_count
+        if assignment: self.assignment = assignment
+        if thief_algorithm: self.thief_algorithm = thief_algorithm
+        if seed is not None:
+            random.seed(seed)
+
+        # 初始化地图
+        if game_map is not None:
+            self.map_data = game_map
+            self.police_count = len(game_map.police_positions)
+        else:
+            self.map_data = GridMap(self.size, self.police_count, self.obstacle_density, self.connected)
+
+        # 初始化游戏状态
+        self.over = False
+        self.turn = 0
+        self.total_steps = 0
+        self.current_police_index = 0
+        self.sub_step_state = "POLICE"
+        self.police_plan = []
+        self.search_time = 0.0
+        self.stalemate.clear()
+        self.state_hash = self._compute_state_hash()
+        self.game_over_reason = ""
+        self.trace = None
+        if self.record:
+            self.trace = TraceRecorder(self.map_data, {
+                "seed": seed, "police_algorithm": self.police_algorithm, "assignment": self.assignment,
+                "thief_algorithm": self.thief_algorithm, "obstacle_density": self.obstacle_density,
+            })
+
+        # 没有警察与小偷连通时不可能抓捕，直接结束而不是拖到僵局或回合上限
+        if not self.map_data.thief_reachable():
+            self._finish("警察无法到达小偷")
+
+    def _finish(self, reason):
+        self.over = True
+        self.game_over_reason = reason
+
+    def save_trace(self, path, reason=None, overwrite=True):
+        """
+        把本局轨迹写入 path（需以 record=True 创建）
+        :param reason: 记录的结束原因，None 表示使用 game_over_reason（例如实验中的回合超限由调用方给出）
+        :param overwrite: 为 False 时 path 已存在则抛出 FileExistsError
+        """
+        self.trace.save(path, self.turn, self.total_steps, self.game_over_reason if reason is None else reason,
+                        overwrite)
+
+    # ================== 游戏逻辑 ==================
+    def step(self):
+        """推进一个子步骤：移动一名警察，或在所有警察移动后移动小偷"""
+        if not self.map_data or self.over:
+            return
+
+        # --- 1. 警察移动阶段 ---
+        if self.sub_step_state == "POLICE":
+            # 警察阶段开始时一次性规划整个团队的移动，之后每个子步骤只读取计划
+            if self.current_police_index == 0:
+                start_time = time.perf_counter()
+                self.police_plan = cooperative_police_move(
+                    self.map_data.police_positions,
+                    self.map_data.thief_pos,
+                    self.map_data,
+                    self.police_algorithm,
+                    self.assignment
+                )
+                self.search_time += time.perf_counter() - start_time
+
+            # 获取当前要移动的警察数据
+            pid, cur_pos = self.map_data.police_positions[self.current_police_index]
+            _, next_pos = self.police_plan[self.current_police_index]
+
+            # 执行移动
+            if next_pos != cur_pos:
+                self.map_data.police_positions[self.current_police_index] = (pid, next_pos)
+                self.total_steps += 1
+                _, police_keys = zobrist_table(self.size)
+                self.state_hash ^= police_keys[cur_pos[0] * self.size + cur_pos[1]] \
+                    ^ police_keys[next_pos[0] * self.size + next_pos[1]]
+            if self.trace is not None:
+                self.trace.move(self.current_police_index, cur_pos, next_pos)
+
+            # 检查抓捕
+            if next_pos == self.map_data.thief_pos:
+                self._finish(f"警察 {pid} 完成抓捕")
+                return
+
+            # 轮向下一个警察或转入小偷回合
+            self.current_police_index += 1
+            if self.current_police_index >= len(self.map_data.police_positions):
+                self.current_police_index = 0
+                self.sub_step_state = "THIEF"
+
+        # --- 2. 小偷移动阶段 ---
+        elif self.sub_step_state == "THIEF":
+            old_thief_pos = self.map_data.thief_pos
+            move_thief = THIEF_ALGORITHMS[self.thief_algorithm]
+            new_thief_pos = move_thief(old_thief_pos, self.map_data.police_positions, self.map_data,
+                                       self.thief_time_budget)
+            self.map_data.thief_pos = new_thief_pos
+            thief_keys, _ = zobrist_table(self.size)
+            self.state_hash ^= thief_keys[old_thief_pos[0] * self.size + old_thief_pos[1]] \
+                ^ thief_keys[new_thief_pos[0] * self.size + new_thief_pos[1]]
+            if self.trace is not None:
+                self.trace.move(len(self.map_data.police_positions), old_thief_pos, new_thief_pos)
+
+            # 检查小偷是否撞上警察
+            if any(pos == self.map_data.thief_pos for _, pos in self.map_data.police_positions):
+                self._finish("小偷无处可逃")
+                return
+
+            # 小偷动完后，才算一个完整回合结束，进行僵局检测
+            self.turn += 1
+            self.sub_step_state = "POLICE"
+            if self.trace is not None:
+                self.trace.end_turn(self.map_data, self.total_steps)
+            self._check_stalemate()
+
+    def run(self, max_turns=None):
+        """连续推进直到对局结束或达到回合上限，返回是否正常结束"""
+        while not self.over and (max_turns is None or self.turn < max_turns):
+            self.step()
+        return self.over
+
+    # ================== 僵局检测逻辑 ==================
+    def _check_stalemate(self):
+        if self.stalemate.check(self.state_hash):
+            self._finish("进入循环僵局")
+
+    def _compute_state_hash(self):
+        """从头计算当前状态哈希；警察键按位异或，与警察顺序无关"""
+        thief_keys, police_keys = zobrist_table(self.size)
+        tr, tc = self.map_data.thief_pos
+        state_hash = thief_keys[tr * self.size + tc]
+        for _, (pr, pc) in self.map_data.police_positions:
+            state_hash ^= police_keys[pr * self.size + pc]
+        return state_hash
+
+
+# --- Snapshot 类 ---
+class Snapshot:
+    __slots__ = ("thief_pos", "police_positions", "turn", "total_steps", "game_over_reason",
+                 "current_police_index", "sub_step_state", "over")
+
+    def __init__(self, sim):
+        """
+        某个子步骤之后的不可变局面副本，界面只绘制快照，不读取正在被后台线程修改的 Simulation
+        :param sim: Simulation 或任何提供相同状态属性的对象（例如 replay.TracePlayer）
+        """
+        self.thief_pos = sim.map_data.thief_pos
+        self.police_positions = tuple(sim.map_data.police_positions)
+        self.turn = sim.turn
+        self.total_steps = sim.total_steps
+        self.game_over_reason = sim.game_over_reason
+        self.current_police_index = sim.current_police_index
+        self.sub_step_state = sim.sub_step_state
+        self.over = sim.over
+
+
+# --- SimulationWorker 类 ---
+class SimulationWorker:
+    POLL_INTERVAL = 0.1  # 队列已满时检查取消标志的间隔（秒）
+
+    def __init__(self, sim, capacity=c.SNAPSHOT_QUEUE_SIZE):
+        """
+        在后台线程中逐个子步骤推进 sim，把每步的 Snapshot 放入有界队列，队列满时等待界面消费；
+        对局结束或被取消后线程退出。sim 在线程退出前只能由本线程修改。
+        搜索是纯 Python 代码，运行时一直持有 GIL，两个线程并不会并行计算；界面不再卡顿是因为界面线程
+        每帧在 clock.tick 中休眠（此时释放 GIL），且解释器定期切换线程，界面线程总能抢到时间片处理事件、
+        绘制已有快照，而队列让绘制不必等待任何一次搜索完成。
+        :param capacity: 最多提前计算的子步骤数
+        """
+        self.sim = sim
+        self.snapshots = queue.Queue(capacity)
+        self.cancelled = threading.Event()
+        self.skipping = threading.Event()  # 跳到结果：剩余对局一次算完，只放入最终快照
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while not self.cancelled.is_set() and not self.sim.over:
+                if self.skipping.is_set():
+                    # 逐个子步骤算完剩余对局，每步之间检查取消标志，取消后最多再完成当前子步骤
+                    while not self.cancelled.is_set() and not self.sim.over:
+                        self.sim.step()
+                    if self.cancelled.is_set():
+                        break
+                else:
+                    self.sim.step()
+                snapshot = Snapshot(self.sim)
+                while not self.cancelled.is_set():
+                    try:
+                        self.snapshots.put(snapshot, timeout=self.POLL_INTERVAL)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            # 异常交给界面线程在 poll 时重新抛出，而不是让界面一直等待
+            self.error = e
+
+    def poll(self):
+        """取出下一个快照，尚未算出时返回 None（不阻塞）"""
+        try:
+            return self.snapshots.get_nowait()
+        except queue.Empty:
+            if self.error is not None:
+                raise self.error
+            return None
+
+    def skip_to_end(self):
+        """不再逐步生成快照：线程连续推进剩余子步骤（仍响应 cancel），只放入最终快照"""
+        self.skipping.set()
+        self._drain()
+
+    def cancel(self):
+        """
+        请求线程退出并丢弃已算出的快照。不等待正在进行的搜索结束：
+        线程最多再完成当前子步骤，之后不再修改 sim，也不再放入快照
+        """
+        self.cancelled.set()
+        self._drain()
+
+    def _drain(self):
+        while True:
+            try:
+                self.snapshots.get_nowait()
+            except queue.Empty:
+                break
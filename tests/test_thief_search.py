@@ -0,0 +1,19 @@
+# 小偷博弈搜索的回归检查
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import Simulation
+
+
+def test_alpha_beta_with_walled_off_officer():
+    """种子 29 的地图上有一名警察与小偷不在同一连通分量，搜索不应因其距离为 None 而出错"""
+    sim = Simulation(20, police_count=5, obstacle_density=0.25, police_algorithm="A*", thief_algorithm="AlphaBeta")
+    sim.reset(seed=29)
+    game_map = sim.map_data
+    assert not all(game_map.same_component(pos, game_map.thief_pos) for _, pos in game_map.police_positions)
+    assert not sim.over
+
+    sim.run(300)
+    assert sim.turn > 0
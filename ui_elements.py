@@ -2,6 +2,33 @@
 import pygame
 import constants as c
 
+# --- 共享字体与文字缓存 ---
+_fonts = {}
+_text_cache = {}
+TEXT_CACHE_SIZE = 512  # 文字表面缓存上限，超出后整体清空
+
+def get_font(size):
+    """按字号共享字体对象，SimHei.ttf 只从磁盘加载一次"""
+    font = _fonts.get(size)
+    if font is None:
+        try:
+            font = pygame.font.Font(c.SIMHEI_FONT_PATH, size)
+        except (FileNotFoundError, OSError):
+            font = pygame.font.Font(None, size)  # 备用字体
+        _fonts[size] = font
+    return font
+
+def render_text(font, text, color):
+    """渲染并缓存文字表面，相同 (字体, 文本, 颜色) 只渲染一次"""
+    key = (id(font), text, color)
+    surf = _text_cache.get(key)
+    if surf is None:
+        if len(_text_cache) >= TEXT_CACHE_SIZE:
+            _text_cache.clear()
+        surf = font.render(text, True, color)
+        _text_cache[key] = surf
+    return surf
+
 # --- Button 类 ---
 class Button:
     def __init__(self, rect, text, color, hover_color, action=None):
@@ -12,17 +39,14 @@ class Button:
         self.action = action
         self.is_hovered = False
 
-        # 使用全局字体
-        try:
-            self.font = pygame.font.Font(c.SIMHEI_FONT_PATH, 24)
-        except FileNotFoundError:
-            self.font = pygame.font.Font(None, 24)  # 备用字体
+        # 使用全局共享字体
+        self.font = get_font(24)
 
     def draw(self, screen):
         current_color = self.hover_color if self.is_hovered else self.color
         pygame.draw.rect(screen, current_color, self.rect, border_radius=5)
 
-        text_surface = self.font.render(self.text, True, c.BLACK)
+        text_surface = render_text(self.font, self.text, c.BLACK)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
@@ -1,117 +1,553 @@
 # 核心算法
 import heapq
+import itertools
+import time
 from collections import deque
 
+from constants import (HPA_MIN_MAP_SIZE, PLANNER_CACHE_SIZE, THIEF_CAPTURE_SCORE, THIEF_SEARCH_DEPTH,
+                       THIEF_TABLE_SIZE, WHCA_WINDOW)
+from map import MOVES, zobrist_table
+
 # ================== 基础启发函数：曼哈顿距离 ==================
 def heuristic(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
+# ================== 占用掩码与路径回溯 ==================
+def _as_occupancy_mask(game_map, blocked_positions):
+    """
+    搜索函数既接受坐标集合，也接受 GridMap.build_occupancy_mask 构建的 bytearray 掩码。
+    集合只在每次调用入口转换一次，掩码则直接复用。
+    """
+    if isinstance(blocked_positions, bytearray):
+        return blocked_positions
+    return game_map.build_occupancy_mask(blocked_positions)
+
+def _first_step(came_from, start_idx, goal_idx, size):
+    """沿 came_from 回溯到起点后的第一步，返回坐标"""
+    if goal_idx not in came_from:
+        return divmod(start_idx, size)
+    cur = goal_idx
+    while came_from[cur] != start_idx and came_from[cur] is not None:
+        cur = came_from[cur]
+    return divmod(cur, size)
+
 # ================== 核心算法：A*==================
 def a_star_next_step(game_map, start, goal, blocked_positions):
-    pq = [(0, start)]
-    g_score = {start: 0}
+    size = game_map.size
+    indptr, indices = game_map.adjacency
+    mask = _as_occupancy_mask(game_map, blocked_positions)
+    start_idx = start[0] * size + start[1]
+    goal_idx = goal[0] * size + goal[1]
+    gr, gc = goal
+
+    # ⭐ 允许进入目标格：每次调用只临时清除一次目标格的占用位
+    goal_occupied = mask[goal_idx]
+    mask[goal_idx] = 0
+
+    pq = [(0, start_idx)]
+    g_score = {start_idx: 0}
     came_from = {}
 
-    while pq:
-        _, current = heapq.heappop(pq)
+    try:
+        while pq:
+            _, current = heapq.heappop(pq)
 
-        if current == goal:
-            while current in came_from and came_from[current] != start:
-                current = came_from[current]
-            return current
+            if current == goal_idx:
+                while current in came_from and came_from[current] != start_idx:
+                    current = came_from[current]
+                return divmod(current, size)
 
-        for neighbor in game_map.get_neighbors_with_blocked(
-                current,
-                blocked_positions - {goal}  # ⭐ 允许进入目标格
-        ):
             new_g = g_score[current] + 1
-            if neighbor not in g_score or new_g < g_score[neighbor]:
-                g_score[neighbor] = new_g
-                f = new_g + heuristic(neighbor, goal)
-                heapq.heappush(pq, (f, neighbor))
-                came_from[neighbor] = current
+            for k in range(indptr[current], indptr[current + 1]):
+                neighbor = indices[k]
+                if mask[neighbor]:
+                    continue
+                if neighbor not in g_score or new_g < g_score[neighbor]:
+                    g_score[neighbor] = new_g
+                    nr, nc = divmod(neighbor, size)
+                    f = new_g + abs(nr - gr) + abs(nc - gc)
+                    heapq.heappush(pq, (f, neighbor))
+                    came_from[neighbor] = current
+    finally:
+        mask[goal_idx] = goal_occupied
 
     return start
 
 # ================== 核心算法：BFS ==================
 def bfs_next_step(game_map, start, goal, blocked_positions):
-    queue = deque([start])
-    came_from = {start: None}
+    size = game_map.size
+    indptr, indices = game_map.adjacency
+    mask = _as_occupancy_mask(game_map, blocked_positions)
+    start_idx = start[0] * size + start[1]
+    goal_idx = goal[0] * size + goal[1]
+
+    queue = deque([start_idx])
+    came_from = {start_idx: None}
 
     while queue:
         current = queue.popleft()
 
-        if current == goal:
+        if current == goal_idx:
             break
 
-        for neighbor in game_map.get_neighbors_with_blocked(current, blocked_positions):
-            if neighbor not in came_from:
+        for k in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[k]
+            if not mask[neighbor] and neighbor not in came_from:
                 came_from[neighbor] = current
                 queue.append(neighbor)
 
-    if goal not in came_from:
-        return start
-
-    cur = goal
-    while came_from[cur] != start and came_from[cur] is not None:
-        cur = came_from[cur]
-    return cur
+    return _first_step(came_from, start_idx, goal_idx, size)
 
 # ================== 核心算法：DFS ==================
 def dfs_next_step(game_map, start, goal, blocked_positions):
-    stack = [start]
-    came_from = {start: None}
+    size = game_map.size
+    indptr, indices = game_map.adjacency
+    mask = _as_occupancy_mask(game_map, blocked_positions)
+    start_idx = start[0] * size + start[1]
+    goal_idx = goal[0] * size + goal[1]
+
+    stack = [start_idx]
+    came_from = {start_idx: None}
 
     while stack:
         current = stack.pop()
 
-        if current == goal:
+        if current == goal_idx:
             break
 
-        for neighbor in game_map.get_neighbors_with_blocked(current, blocked_positions):
-            if neighbor not in came_from:
+        for k in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[k]
+            if not mask[neighbor] and neighbor not in came_from:
                 came_from[neighbor] = current
                 stack.append(neighbor)
 
-    if goal not in came_from:
-        return start
-
-    cur = goal
-    while came_from[cur] != start and came_from[cur] is not None:
-        cur = came_from[cur]
-    return cur
+    return _first_step(came_from, start_idx, goal_idx, size)
 
 # ================== 核心算法：GREEDY ==================
 def greedy_next_step(game_map, start, goal, blocked_positions):
-    pq = [(heuristic(start, goal), start)]
-    came_from = {start: None}
+    size = game_map.size
+    indptr, indices = game_map.adjacency
+    mask = _as_occupancy_mask(game_map, blocked_positions)
+    start_idx = start[0] * size + start[1]
+    goal_idx = goal[0] * size + goal[1]
+    gr, gc = goal
+
+    pq = [(heuristic(start, goal), start_idx)]
+    came_from = {start_idx: None}
 
     while pq:
         _, current = heapq.heappop(pq)
 
-        if current == goal:
+        if current == goal_idx:
             break
 
-        for neighbor in game_map.get_neighbors_with_blocked(current, blocked_positions):
-            if neighbor not in came_from:
+        for k in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[k]
+            if not mask[neighbor] and neighbor not in came_from:
                 came_from[neighbor] = current
-                heapq.heappush(pq, (heuristic(neighbor, goal), neighbor))
+                nr, nc = divmod(neighbor, size)
+                heapq.heappush(pq, (abs(nr - gr) + abs(nc - gc), neighbor))
+
+    return _first_step(came_from, start_idx, goal_idx, size)
+
+# ================== 核心算法：FLOW FIELD ==================
+def flow_field_next_step(game_map, start, goal, blocked_positions):
+    """
+    流场寻路：以目标为源点的反向 BFS 距离场由 GridMap 缓存，同一回合内所有追向同一目标的警察共享。
+    每名警察只需查看四个邻居的距离值，单步成本与团队规模无关。
+    """
+    size = game_map.size
+    indptr, indices = game_map.adjacency
+    mask = _as_occupancy_mask(game_map, blocked_positions)
+    field = game_map.distance_field(goal)
+    start_idx = start[0] * size + start[1]
+    goal_idx = goal[0] * size + goal[1]
+
+    best_dist = field[start_idx]
+    if best_dist < 0:
+        return start  # 无法到达
+
+    # 只走严格更靠近目标的空闲邻居，距离相同按方向顺序取第一个；目标格允许进入
+    best_step = start_idx
+    for k in range(indptr[start_idx], indptr[start_idx + 1]):
+        neighbor = indices[k]
+        dist = field[neighbor]
+        if 0 <= dist < best_dist and (not mask[neighbor] or neighbor == goal_idx):
+            best_dist = dist
+            best_step = neighbor
+    return divmod(best_step, size)
+
+# ================== 核心算法：增量重规划（Moving Target D* Lite） ==================
+_INF = float('inf')
+
+# --- IncrementalPlanner 类 ---
+class IncrementalPlanner:
+    __slots__ = (
+        "size", "indptr", "indices", "g", "rhs", "parent", "open", "heap",
+        "touched", "root", "goal", "km", "blocked", "expansions",
+    )
+
+    def __init__(self, game_map, start_idx, goal_idx, blocked):
+        """
+        单名警察的增量搜索状态：以警察所在格为根做前向 LPA*，回合之间保留 g/rhs 与搜索树。
+        - 警察沿路径前进一步：只删除不在新根子树中的格子，子树内的 g 值整体相差常数，无需重算；
+        - 目标移动：累加启发偏移 km，队列中的旧键仍是下界，取出时再修正；
+        - 占用格变化：只更新状态改变的格子。
+        :param blocked: 被其他角色占用的格子下标集合
+        """
+        self.size = game_map.size
+        self.indptr, self.indices = game_map.adjacency
+        n = self.size * self.size
+        self.g = [_INF] * n
+        self.rhs = [_INF] * n
+        self.parent = [-1] * n  # rhs 取得最小值的前驱，构成以根为起点的搜索树
+        self.open = {}          # 不一致格子 -> 当前有效键，heap 中键不匹配的条目视为过期
+        self.heap = []
+        self.touched = set()    # g 或 rhs 有限的格子
+        self.expansions = 0     # 累计扩展节点数，用于衡量增量复用的效果
+        self.goal = goal_idx
+        self.blocked = blocked
+        self._reset_root(start_idx)
+
+    def _reset_root(self, start_idx):
+        for u in self.touched:
+            self.g[u] = self.rhs[u] = _INF
+            self.parent[u] = -1
+        self.touched = {start_idx}
+        self.open.clear()
+        self.heap.clear()
+        self.km = 0
+        self.root = start_idx
+        self.rhs[start_idx] = 0
+        self._push(start_idx)
+
+    def _key(self, u):
+        m = self.g[u] if self.g[u] < self.rhs[u] else self.rhs[u]
+        ur, uc = divmod(u, self.size)
+        gr, gc = divmod(self.goal, self.size)
+        return (m + abs(ur - gr) + abs(uc - gc) + self.km, m)
+
+    def _push(self, u):
+        key = self._key(u)
+        self.open[u] = key
+        heapq.heappush(self.heap, (key, u))
+
+    def _update_vertex(self, u):
+        """按前驱重新计算 rhs(u)；根的 rhs 固定不变。被占用的格子（目标格除外）不可进入"""
+        if u != self.root:
+            best, best_parent = _INF, -1
+            if u == self.goal or u not in self.blocked:
+                g = self.g
+                indices = self.indices
+                for k in range(self.indptr[u], self.indptr[u + 1]):
+                    p = indices[k]
+                    if g[p] + 1 < best:
+                        best, best_parent = g[p] + 1, p
+            self.rhs[u] = best
+            self.parent[u] = best_parent
+            if best < _INF:
+                self.touched.add(u)
+        if self.g[u] != self.rhs[u]:
+            self._push(u)
+        else:
+            self.open.pop(u, None)
+
+    def _top_key(self):
+        heap, open_keys = self.heap, self.open
+        while heap:
+            key, u = heap[0]
+            if open_keys.get(u) == key:
+                return key
+            heapq.heappop(heap)  # 过期条目
+        return None
+
+    def _compute_shortest_path(self):
+        g, rhs, goal = self.g, self.rhs, self.goal
+        indptr, indices = self.indptr, self.indices
+        while True:
+            top = self._top_key()
+            if top is None or (top >= self._key(goal) and rhs[goal] == g[goal]):
+                return
+            key_old, u = heapq.heappop(self.heap)
+            key_new = self._key(u)
+            if key_old < key_new:
+                # 目标移动后旧键偏小，按新键重新入队
+                self._push(u)
+                continue
+            del self.open[u]
+            self.expansions += 1
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+            else:
+                g[u] = _INF
+                self._update_vertex(u)
+            for k in range(indptr[u], indptr[u + 1]):
+                self._update_vertex(indices[k])
+
+    def _move_root(self, start_idx):
+        """
+        警察移动到新根：保留新根在旧搜索树中的子树（g 值与真实距离相差常数 rhs(新根)），
+        其余格子清空后由相邻的保留格子重新计算 rhs，形成新的搜索边界。
+        """
+        if start_idx == self.root:
+            return
+        if self.parent[start_idx] != self.root or self.rhs[start_idx] == _INF:
+            self._reset_root(start_idx)
+            return
 
-    if goal not in came_from:
+        parent, indptr, indices = self.parent, self.indptr, self.indices
+        keep = {start_idx}
+        stack = [start_idx]
+        while stack:
+            u = stack.pop()
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                if parent[v] == u and v not in keep:
+                    keep.add(v)
+                    stack.append(v)
+
+        deleted = self.touched - keep
+        for u in deleted:
+            self.g[u] = self.rhs[u] = _INF
+            parent[u] = -1
+            self.open.pop(u, None)
+        self.touched = keep
+        self.root = start_idx
+        parent[start_idx] = -1
+        for u in deleted:
+            self._update_vertex(u)
+
+    def plan(self, start_idx, goal_idx, blocked):
+        """
+        根据本回合的起点、目标与占用格修补搜索状态，返回下一步的格子下标（无路可走时返回起点）
+        :param blocked: 被其他角色占用的格子下标集合
+        """
+        self._move_root(start_idx)
+
+        if goal_idx != self.goal:
+            size = self.size
+            (or_, oc), (nr, nc) = divmod(self.goal, size), divmod(goal_idx, size)
+            self.km += abs(or_ - nr) + abs(oc - nc)
+            old_goal, self.goal = self.goal, goal_idx
+            self._update_vertex(old_goal)  # 目标格的占用豁免随目标转移
+            self._update_vertex(goal_idx)
+
+        changed = self.blocked ^ blocked
+        self.blocked = blocked
+        for u in changed:
+            self._update_vertex(u)
+
+        self._compute_shortest_path()
+        return self._next_step()
+
+    def _next_step(self):
+        g, root = self.g, self.root
+        cur = self.goal
+        if cur == root or g[cur] == _INF:
+            return root
+        indptr, indices = self.indptr, self.indices
+        while True:
+            # 从目标沿 g 值最小的前驱回溯，到根的子节点即为下一步
+            best = -1
+            for k in range(indptr[cur], indptr[cur + 1]):
+                p = indices[k]
+                if best < 0 or g[p] < g[best]:
+                    best = p
+            if best == root:
+                return cur
+            if best < 0 or g[best] >= g[cur]:
+                return root
+            cur = best
+
+
+def _blocked_cells(mask):
+    """占用掩码中为 1 的下标集合（bytearray.find 在 C 层扫描）"""
+    cells = set()
+    i = mask.find(1)
+    while i >= 0:
+        cells.add(i)
+        i = mask.find(1, i + 1)
+    return cells
+
+
+def incremental_next_step(game_map, start, goal, blocked_positions):
+    """
+    增量重规划：每名警察的搜索状态保存在 GridMap.planner_states 中，键为该警察预期下回合所在的格子，
+    下一次调用以当前位置取回状态并只修补变化部分。状态缺失（新开局、计划被打断）时从头搜索。
+    """
+    size = game_map.size
+    mask = _as_occupancy_mask(game_map, blocked_positions)
+    start_idx = start[0] * size + start[1]
+    goal_idx = goal[0] * size + goal[1]
+    blocked = _blocked_cells(mask)
+
+    states = game_map.planner_states
+    planner = states.pop(start_idx, None)
+    if planner is None:
+        planner = IncrementalPlanner(game_map, start_idx, goal_idx, blocked)
+    step = planner.plan(start_idx, goal_idx, blocked)
+
+    states[step] = planner
+    if len(states) > PLANNER_CACHE_SIZE:
+        states.popitem(last=False)
+    return divmod(step, size)
+
+# ================== 核心算法：JPS（四连通跳点搜索） ==================
+def _jps_search(game_map, start_idx, goal_idx, mask):
+    """
+    四连通跳点搜索：沿直线跳跃直到遇到目标、强迫邻居或（竖直移动时）可横向分支的格子，只有跳点入堆。
+    静态障碍的停止位置查 GridMap.jump_tables；被占用的格子（目标格除外）与目标只影响附近的行列，
+    在这些位置额外停下（多停不影响最优性）。
+    返回 (最短路径长度, 起点后第一个跳点)，不可达时返回 (None, -1)。
+    """
+    size = game_map.size
+    tables = game_map.jump_tables()
+    gr, gc = divmod(goal_idx, size)
+    blockers = [divmod(i, size) for i in _blocked_cells(mask) if i != goal_idx]
+
+    def jump(r, c, dr, dc):
+        """从 (r, c) 起沿 (dr, dc) 跳跃，返回跳点下标或 -1"""
+        if not (0 <= r < size and 0 <= c < size):
+            return -1
+        i = r * size + c
+        code = tables[(dr, dc)][i]
+        if code < 0 or (mask[i] and i != goal_idx):
+            return -1
+        limit = code >> 1
+        stop = limit if code & 1 else None
+
+        if dc:
+            # 横向：同行的占用格截断直线，相邻行的占用格在其身后一格产生强迫邻居
+            if gr == r and 0 <= (gc - c) * dc <= limit:
+                stop = (gc - c) * dc if stop is None else min(stop, (gc - c) * dc)
+            for br, bc in blockers:
+                d = (bc - c) * dc
+                if br == r:
+                    if 0 <= d <= limit:
+                        limit = d - 1
+                elif abs(br - r) == 1 and 0 <= d + 1 <= limit:
+                    stop = d + 1 if stop is None else min(stop, d + 1)
+        else:
+            # 竖直：目标所在行与占用格上下三行的横向分支可能改变，在这些行停下
+            if 0 <= (gr - r) * dr <= limit:
+                stop = (gr - r) * dr if stop is None else min(stop, (gr - r) * dr)
+            for br, bc in blockers:
+                d = (br - r) * dr
+                if bc == c and 0 <= d <= limit:
+                    limit = d - 1
+                for e in (d - 1, d, d + 1):
+                    if 0 <= e <= limit:
+                        stop = e if stop is None else min(stop, e)
+                        break
+
+        if stop is None or stop > limit:
+            return -1
+        return (r + stop * dr) * size + c + stop * dc
+
+    sr, sc = divmod(start_idx, size)
+    g_score = {start_idx: 0}
+    came_from = {start_idx: None}
+    arrival = {start_idx: (0, 0)}  # 到达跳点时的移动方向，用于剪枝
+    pq = [(abs(sr - gr) + abs(sc - gc), start_idx)]
+
+    while pq:
+        f, current = heapq.heappop(pq)
+        r, c = divmod(current, size)
+        g = g_score[current]
+        if f > g + abs(r - gr) + abs(c - gc):
+            continue  # 过期条目
+        if current == goal_idx:
+            while came_from[current] != start_idx:
+                current = came_from[current]
+            return g, current
+
+        dr, dc = arrival[current]
+        if dc:
+            directions = ((0, dc), (1, 0), (-1, 0))
+        elif dr:
+            directions = ((dr, 0), (0, 1), (0, -1))
+        else:
+            directions = MOVES
+        for dr, dc in directions:
+            jp = jump(r + dr, c + dc, dr, dc)
+            if jp < 0:
+                continue
+            jr, jc = divmod(jp, size)
+            new_g = g + abs(jr - r) + abs(jc - c)
+            if jp not in g_score or new_g < g_score[jp]:
+                g_score[jp] = new_g
+                came_from[jp] = current
+                arrival[jp] = (dr, dc)
+                heapq.heappush(pq, (new_g + abs(jr - gr) + abs(jc - gc), jp))
+
+    return None, -1
+
+def jps_next_step(game_map, start, goal, blocked_positions):
+    """
+    JPS 寻路：路径长度与 A* 相同，但只扩展跳点，开阔地图上入堆节点远少于 A*。
+    存在多个最短第一步时，取起点邻居中 (f, 下标) 最小的一个。A* 的选择取决于各条最短路径在堆中的
+    先后竞争（目标格的 came_from 由最先出堆的前驱写入），要复现就得逐格展开最短路径区域，失去跳点的意义；
+    因此平局时两者偶有不同（随机测试约 1% 的平局），路径长度始终一致。
+    """
+    size = game_map.size
+    indptr, indices = game_map.adjacency
+    mask = _as_occupancy_mask(game_map, blocked_positions)
+    start_idx = start[0] * size + start[1]
+    goal_idx = goal[0] * size + goal[1]
+    if start_idx == goal_idx:
         return start
 
-    cur = goal
-    while came_from[cur] != start and came_from[cur] is not None:
-        cur = came_from[cur]
-    return cur
+    length, jump_point = _jps_search(game_map, start_idx, goal_idx, mask)
+    if length is None:
+        return start
+    jr, jc = divmod(jump_point, size)
+    sr, sc = start
+    step = (sr + (jr > sr) - (jr < sr)) * size + sc + (jc > sc) - (jc < sc)
+
+    # 排在找到的第一步之前的候选逐个验证：能以 length-1 步到达目标即为更优先的最短第一步
+    gr, gc = goal
+    candidates = sorted(
+        (abs(nr - gr) + abs(nc - gc), n)
+        for n in indices[indptr[start_idx]:indptr[start_idx + 1]]
+        if not mask[n] or n == goal_idx
+        for nr, nc in (divmod(n, size),)
+    )
+    step_key = (abs(step // size - gr) + abs(step % size - gc), step)
+    for candidate in candidates:
+        if candidate >= step_key:
+            break
+        n = candidate[1]
+        if n == goal_idx or _jps_search(game_map, n, goal_idx, mask)[0] == length - 1:
+            return divmod(n, size)
+    return divmod(step, size)
+
+# ================== 核心算法：HPA*（分层寻路） ==================
+def hpa_next_step(game_map, start, goal, blocked_positions):
+    """
+    分层寻路：先在 GridMap.cluster_graph() 的入口图上规划粗略路线，
+    再用 A* 在警察附近细化到第一个路标（同簇过渡格或目标），单次搜索成本与地图面积基本无关。
+    抽象图只考虑障碍物，其他警察的占用只在局部细化时避让。
+    """
+    size = game_map.size
+    mask = _as_occupancy_mask(game_map, blocked_positions)
+    start_idx = start[0] * size + start[1]
+    goal_idx = goal[0] * size + goal[1]
+
+    length, waypoint = game_map.cluster_graph().route(start_idx, goal_idx)
+    if length is None or waypoint == start_idx:
+        return start
+    step = a_star_next_step(game_map, start, divmod(waypoint, size), mask)
+    # 路标本身被其他警察占用时原地等待（只有真正的目标格允许进入）
+    if step != goal and mask[step[0] * size + step[1]]:
+        return start
+    return step
 
 # ================== 核心算法：团队协作逻辑  ==================
-def find_cooperative_target(thief_pos, police_positions, game_map):
+def find_cooperative_target(thief_pos, police_positions, game_map, assignment="greedy"):
     """
     返回：{(r,c): target_pos}
+    :param assignment: 围堵格分配方式，见 ASSIGNMENT_MODES
     """
-    police_targets = {}
-
     # 只取坐标
     pure_positions = [pos for _, pos in police_positions]
 
@@ -125,58 +561,134 @@ def find_cooperative_target(thief_pos, police_positions, game_map):
 
     for dr, dc in [(0,1),(0,-1),(1,0),(-1,0)]:
         nr, nc = tr + dr, tc + dc
-        if game_map._is_valid(nr, nc) and game_map.map[nr][nc] != '#':
+        if game_map._is_valid(nr, nc) and not game_map.is_obstacle(nr, nc):
             chase_area.append((nr, nc))
 
     if not chase_area:
         return {p: thief_pos for p in pure_positions}
 
-    remaining_targets = set(chase_area)
+    # 距离矩阵：每个围堵格一张缓存的 BFS 距离场即可给出所有警察到它的距离
+    dist = [[game_map.distance(p, target) for target in chase_area] for p in pure_positions]
+    chosen = ASSIGNMENT_MODES[assignment](pure_positions, thief_pos, dist)
+    return {
+        p: chase_area[j] if j >= 0 else thief_pos
+        for p, j in zip(pure_positions, chosen)
+    }
+
+def _greedy_assignment(pure_positions, thief_pos, dist):
+    """
+    贪心分配：按曼哈顿距离由近到远，每名警察领取最近的剩余围堵格。
+    返回每名警察分到的围堵格下标，-1 表示直接追向小偷。
+    """
+    # 按 chase_area 的方向顺序遍历剩余目标，距离相同时结果可复现（批量模拟器依赖这一顺序）
+    remaining = list(range(len(dist[0])))
+    chosen = [-1] * len(pure_positions)
 
     sorted_police = sorted(
-        pure_positions,
-        key=lambda p: heuristic(p, thief_pos)
+        range(len(pure_positions)),
+        key=lambda i: heuristic(pure_positions[i], thief_pos)
     )
 
-    for p in sorted_police:
-        best_target = None
+    for i in sorted_police:
+        best_target = -1
         min_dist = float('inf')
 
-        for target in remaining_targets:
-            dist = get_a_star_distance(game_map, p, target)
-            if dist is not None and dist < min_dist:
-                min_dist = dist
-                best_target = target
+        for j in remaining:
+            d = dist[i][j]
+            if d is not None and d < min_dist:
+                min_dist = d
+                best_target = j
 
-        police_targets[p] = best_target if best_target else thief_pos
-        if best_target:
-            remaining_targets.remove(best_target)
+        chosen[i] = best_target
+        if best_target >= 0:
+            remaining.remove(best_target)
 
-    return police_targets
+    return chosen
 
-# ================== 辅助函数：快速获取 A* 路径长度  ==================
-def get_a_star_distance(game_map, start, goal):
+def _optimal_assignment(pure_positions, thief_pos, dist):
     """
-    运行 A* 并返回从起点到目标的实际路径长度 (g_score)。
+    最优分配：最小化被分配警察到各自围堵格的距离总和（匈牙利算法）。
+    警察多于围堵格时只有总距离最小的一组警察分到围堵格，其余追向小偷；不可达的配对不会被采用。
     """
-    pq = [(0, start)]  # (f_score, pos)
-    g_score = {start: 0}
+    unreachable = len(pure_positions) * 4 * (max(
+        (d for row in dist for d in row if d is not None), default=0) + 1)
+    cost = [[d if d is not None else unreachable for d in row] for row in dist]
 
-    while pq:
-        _, current = heapq.heappop(pq)
+    chosen = [-1] * len(pure_positions)
+    if len(cost) <= len(cost[0]):
+        for i, j in enumerate(_hungarian(cost)):
+            if cost[i][j] < unreachable:
+                chosen[i] = j
+    else:
+        transposed = [list(col) for col in zip(*cost)]
+        for j, i in enumerate(_hungarian(transposed)):
+            if cost[i][j] < unreachable:
+                chosen[i] = j
+    return chosen
 
-        if current == goal:
-            return g_score[current]
+def _hungarian(cost):
+    """
+    匈牙利算法（势能 + 最短增广路，O(n²m)），要求行数不超过列数。
+    返回每行分配到的列下标，使总代价最小。
+    """
+    n, m = len(cost), len(cost[0])
+    inf = float('inf')
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    match = [0] * (m + 1)  # match[j]：列 j 当前分配到的行（1 起始，0 表示空闲）
+    way = [0] * (m + 1)
 
-        for neighbor in game_map.get_neighbors(current):
-            new_g_score = g_score[current] + 1
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        min_v = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            delta, j1 = inf, 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                    if cur < min_v[j]:
+                        min_v[j], way[j] = cur, j0
+                    if min_v[j] < delta:
+                        delta, j1 = min_v[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        # 沿增广路翻转匹配
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
 
-            if neighbor not in g_score or new_g_score < g_score[neighbor]:
-                g_score[neighbor] = new_g_score
-                f_score = new_g_score + heuristic(neighbor, goal)
-                heapq.heappush(pq, (f_score, neighbor))
+    result = [-1] * n
+    for j in range(1, m + 1):
+        if match[j]:
+            result[match[j] - 1] = j - 1
+    return result
 
-    return None  # 无法到达
+# 围堵格分配方式
+ASSIGNMENT_MODES = {
+    "greedy": _greedy_assignment,
+    "hungarian": _optimal_assignment,
+}
+
+# ================== 辅助函数：快速获取 A* 路径长度  ==================
+def get_a_star_distance(game_map, start, goal):
+    """
+    返回从起点到目标的实际路径长度，无法到达时返回 None。
+    结果与 A* 的 g_score 一致，但直接查询 GridMap 缓存的 BFS 距离场；
+    大地图上由 GridMap.distance 改为查询 HPA* 抽象图的近似路线长度。
+    """
+    return game_map.distance(start, goal)
 
 # ================== 警察协作移动逻辑 ==================
 POLICE_ALGORITHMS = {
@@ -184,6 +696,10 @@ POLICE_ALGORITHMS = {
     "BFS": bfs_next_step,
     "DFS": dfs_next_step,
     "Greedy": greedy_next_step,
+    "FlowField": flow_field_next_step,
+    "D*Lite": incremental_next_step,
+    "JPS": jps_next_step,
+    "HPA*": hpa_next_step,
 }
 
 # 策略选择接口
@@ -201,39 +717,140 @@ def cooperative_police_move(
         police_positions,  # [(pid, (r,c)), ...]
         thief_pos,
         game_map,
-        algorithm_name
+        algorithm_name,
+        assignment="greedy"
 ):
+    team_move = TEAM_ALGORITHMS.get(algorithm_name)
+    if team_move:
+        return team_move(police_positions, thief_pos, game_map, assignment=assignment)
+
     new_positions = []
 
-    # 只取坐标
+    # 只取坐标，占用掩码在整个团队规划过程中原地更新
     pure_positions = [pos for _, pos in police_positions]
-    blocked_positions = set(pure_positions)
+    occupancy = game_map.build_occupancy_mask(pure_positions)
+    size = game_map.size
 
     police_targets = find_cooperative_target(
         thief_pos,
         police_positions,
-        game_map
+        game_map,
+        assignment
     )
 
     for pid, police_pos in police_positions:
-        blocked_positions.remove(police_pos)
+        occupancy[police_pos[0] * size + police_pos[1]] = 0
 
         target = police_targets.get(police_pos, thief_pos)
         next_pos = move_police_with_strategy(
             police_pos,
             target,
             game_map,
-            blocked_positions,
+            occupancy,
             algorithm_name
         )
 
-        blocked_positions.add(next_pos)
+        occupancy[next_pos[0] * size + next_pos[1]] = 1
         new_positions.append((pid, next_pos))
 
     return new_positions
 
+# ================== 团队算法：WHCA*（窗口化时空预约表） ==================
+def _space_time_search(game_map, start_idx, goal_idx, reserved, swaps, first_blocked, capture_idx, window):
+    """
+    在 (格子, 时刻) 空间做 A*，每个时间步代价为 1（包括原地等待），启发值为忽略其他警察的真实距离。
+    到达目标或窗口末端即为终点，窗口末端的代价为 t + 剩余距离估计。
+    :param reserved: 已被其他警察预约的 (格子, 时刻)
+    :param swaps: 已被预约的 (起格, 终格, 时刻)，禁止对向交换
+    :param first_blocked: 第一步不能进入的格子（本回合稍后才移动的警察当前所在格）
+    :param capture_idx: 小偷所在格，不受预约限制
+    :return: 路径 [起点, 第 1 步, ...]，最长 window+1 格
+    """
+    size = game_map.size
+    indptr, indices = game_map.adjacency
+    if size < HPA_MIN_MAP_SIZE:
+        field = game_map.distance_field(divmod(goal_idx, size))
+        h = lambda idx: field[idx]
+    else:
+        gr, gc = divmod(goal_idx, size)
+        h = lambda idx: abs(idx // size - gr) + abs(idx % size - gc)
+
+    if h(start_idx) < 0:
+        return [start_idx]
+    start = (start_idx, 0)
+    came_from = {start: None}
+    pq = [(h(start_idx), 0, start_idx)]
+    end = None
+
+    while pq:
+        _, t, cell = heapq.heappop(pq)
+        if cell == goal_idx or t == window:
+            end = (cell, t)
+            break
+        nt = t + 1
+        for k in range(indptr[cell], indptr[cell + 1] + 1):
+            nxt = indices[k] if k < indptr[cell + 1] else cell  # 最后一项为原地等待
+            node = (nxt, nt)
+            if node in came_from:
+                continue
+            if nxt != capture_idx:
+                if node in reserved or (nt == 1 and nxt in first_blocked):
+                    continue
+            if (nxt, cell, nt) in swaps:
+                continue
+            dist = h(nxt)
+            if dist < 0:
+                continue
+            came_from[node] = (cell, t)
+            heapq.heappush(pq, (nt + dist, nt, nxt))
+
+    if end is None:
+        return [start_idx]
+    path = []
+    while end is not None:
+        path.append(end[0])
+        end = came_from[end]
+    return path[::-1]
+
+def whca_police_move(police_positions, thief_pos, game_map, window=WHCA_WINDOW, assignment="greedy"):
+    """
+    窗口化协作 A*：警察按编号依次在时空预约表上规划 window 步，后规划的警察避开已预约的格子与对向交换，
+    整个团队一次规划出互不冲突的短期路径，每回合只执行第一步、窗口随之滑动。
+    执行时警察按编号依次移动，因此第一步只需避开编号更大（尚未移动）的警察当前所在格。
+    """
+    size = game_map.size
+    police_targets = find_cooperative_target(thief_pos, police_positions, game_map, assignment)
+    capture_idx = thief_pos[0] * size + thief_pos[1]
+
+    reserved = set()
+    swaps = set()
+    first_blocked = {r * size + c for _, (r, c) in police_positions}
+    new_positions = []
+
+    for pid, police_pos in police_positions:
+        start_idx = police_pos[0] * size + police_pos[1]
+        first_blocked.discard(start_idx)
+        target = police_targets.get(police_pos, thief_pos)
+        path = _space_time_search(game_map, start_idx, target[0] * size + target[1],
+                                  reserved, swaps, first_blocked, capture_idx, window)
+
+        # 预约整条路径；提前到达终点的警察在窗口剩余时间内停留原地
+        path.extend([path[-1]] * (window + 1 - len(path)))
+        for t in range(1, window + 1):
+            reserved.add((path[t], t))
+            swaps.add((path[t - 1], path[t], t))
+        new_positions.append((pid, divmod(path[1], size)))
+
+    return new_positions
+
+# 团队算法：一次为整个团队规划，替代逐个警察调用 POLICE_ALGORITHMS
+TEAM_ALGORITHMS = {
+    "WHCA*": whca_police_move,
+}
+
 # ================== 小偷逃跑逻辑：最大化最小距离策略 ==================
-def move_thief(thief_pos, police_positions, game_map):
+def move_thief(thief_pos, police_positions, game_map, time_budget=None):
+    """按曼哈顿距离做一步极大极小（不考虑障碍物），time_budget 无效"""
     r, c = thief_pos
     police_cells = {p for _, p in police_positions}
     candidates = [
@@ -256,4 +873,228 @@ def move_thief(thief_pos, police_positions, game_map):
             best_score = score
             best_pos = next_pos
 
-    return best_pos
\ No newline at end of file
+    return best_pos
+
+# ================== 小偷：按真实路径距离的一步极大极小 ==================
+def _police_distances(game_map, police_cells, targets):
+    """
+    以全部警察为源点做一次多源 BFS，返回 {格子下标: 到最近警察的步数}。
+    targets 中的格子全部定距后提前结束，不可达的格子不在结果中。
+    """
+    size = game_map.size
+    indptr, indices = game_map.adjacency
+    dist = {}
+    queue = deque()
+    for r, c in police_cells:
+        idx = r * size + c
+        if idx not in dist:
+            dist[idx] = 0
+            queue.append(idx)
+
+    remaining = {r * size + c for r, c in targets}.difference(dist)
+    while queue and remaining:
+        current = queue.popleft()
+        next_dist = dist[current] + 1
+        for k in range(indptr[current], indptr[current + 1]):
+            nxt = indices[k]
+            if nxt not in dist:
+                dist[nxt] = next_dist
+                queue.append(nxt)
+                remaining.discard(nxt)
+    return dist
+
+def path_thief_move(thief_pos, police_positions, game_map, time_budget=None):
+    """与 move_thief 相同的一步极大极小，但以绕开障碍物的真实 BFS 距离评分，time_budget 无效"""
+    police_cells = {p for _, p in police_positions}
+    candidates = [
+        pos for pos in game_map.get_neighbors(thief_pos) + [thief_pos]
+        if pos not in police_cells
+    ]
+    size = game_map.size
+    dist = _police_distances(game_map, police_cells, candidates)
+
+    best_pos = thief_pos
+    best_score = -1
+    for next_pos in candidates:
+        # 所有警察都到不了的格子视为无穷远
+        score = dist.get(next_pos[0] * size + next_pos[1], _INF)
+        if score > best_score:
+            best_score = score
+            best_pos = next_pos
+    return best_pos
+
+# ================== 小偷：深度受限的 Alpha-Beta 博弈搜索 ==================
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+
+class _SearchTimeout(Exception):
+    """超出时间预算，放弃当前迭代深度"""
+
+
+# --- ThiefSearch 类 ---
+class ThiefSearch:
+    __slots__ = ("game_map", "size", "indptr", "indices", "thief_keys", "police_keys",
+                 "table", "deadline", "nodes")
+
+    def __init__(self, game_map, deadline=None):
+        """
+        小偷回合为 Max 节点、警察团队的联合移动为 Min 节点的 Alpha-Beta 搜索。
+        - 警察模型：每名警察只考虑缩短其到小偷真实距离的走法（无路可走时原地），
+          距离超出搜索视野的警察只取第一个走法，联合移动中不允许两名警察进入同一格；
+        - 叶子估值：最近警察到小偷的真实距离，被抓为 -THIEF_CAPTURE_SCORE（越晚被抓分数越高）；
+        - 置换表以 Zobrist 局面哈希为键保存在 GridMap.thief_table 中，跨回合复用。
+        :param deadline: time.perf_counter() 截止时刻，None 表示不限时
+        """
+        self.game_map = game_map
+        self.size = game_map.size
+        self.indptr, self.indices = game_map.adjacency
+        self.thief_keys, self.police_keys = zobrist_table(self.size)
+        self.table = game_map.thief_table
+        self.deadline = deadline
+        self.nodes = 0
+
+    def _distance_to(self, thief_idx):
+        """返回 (格子下标 -> 到小偷的距离) 的查询函数，不可达为 None"""
+        size = self.size
+        thief_pos = divmod(thief_idx, size)
+        if size >= HPA_MIN_MAP_SIZE:
+            return lambda idx: self.game_map.distance(divmod(idx, size), thief_pos)
+        field = self.game_map.distance_field(thief_pos)
+        return lambda idx: field[idx] if field[idx] >= 0 else None
+
+    def _evaluate(self, thief_idx, police):
+        distance = self._distance_to(thief_idx)
+        best = self.size * self.size  # 所有警察都不可达时取最大值
+        for p in police:
+            d = distance(p)
+            if d is not None and d < best:
+                best = d
+        return best
+
+    def best_move(self, thief_idx, police, max_depth):
+        """迭代加深到 max_depth，返回最后一个完整深度的最佳落点下标；第一层就超时返回 None"""
+        state_hash = self.thief_keys[thief_idx]
+        for p in police:
+            state_hash ^= self.police_keys[p]
+
+        best = None
+        for depth in range(1, max_depth + 1):
+            try:
+                _, move = self._max(thief_idx, tuple(police), state_hash, depth, -_INF, _INF)
+            except _SearchTimeout:
+                break
+            best = move
+        return best
+
+    def _check_time(self):
+        self.nodes += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _SearchTimeout
+
+    def _max(self, thief_idx, police, state_hash, depth, alpha, beta):
+        self._check_time()
+
+        entry = self.table.get(state_hash)
+        table_move = -1
+        if entry is not None:
+            entry_depth, value, flag, table_move = entry
+            if entry_depth >= depth:
+                if flag == _EXACT:
+                    return value, table_move
+                if flag == _LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, table_move
+        if depth == 0:
+            return self._evaluate(thief_idx, police), thief_idx
+
+        indptr, indices = self.indptr, self.indices
+        moves = [indices[k] for k in range(indptr[thief_idx], indptr[thief_idx + 1])]
+        moves.append(thief_idx)
+        moves = [m for m in moves if m not in police]
+        # 置换表记录的最佳走法优先搜索，提高剪枝效率
+        if table_move in moves:
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+
+        alpha_orig = alpha
+        best_value, best_move = -_INF, thief_idx
+        thief_key = self.thief_keys[thief_idx]
+        for move in moves:
+            value = self._min(move, police, state_hash ^ thief_key ^ self.thief_keys[move], depth, alpha, beta)
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, best_value)
+            if alpha >= beta:
+                break
+
+        flag = _UPPER if best_value <= alpha_orig else _LOWER if best_value >= beta else _EXACT
+        if len(self.table) >= THIEF_TABLE_SIZE:
+            self.table.clear()
+        self.table[state_hash] = (depth, best_value, flag, best_move)
+        return best_value, best_move
+
+    def _min(self, thief_idx, police, state_hash, depth, alpha, beta):
+        self._check_time()
+        distance = self._distance_to(thief_idx)
+        indptr, indices = self.indptr, self.indices
+        horizon = 2 * depth  # 视野之外的警察无法在剩余回合内抓到小偷，不展开其分支
+
+        options = []
+        for p in police:
+            d = distance(p)
+            if d is None:
+                # 与小偷不在同一连通分量的警察永远无法抓到小偷，按原地不动处理
+                options.append([p])
+                continue
+            if d <= 1:
+                # 有警察与小偷相邻，本回合即可抓捕
+                return -THIEF_CAPTURE_SCORE - depth
+            steps = [
+                indices[k] for k in range(indptr[p], indptr[p + 1])
+                if distance(indices[k]) == d - 1
+            ]
+            if not steps:
+                steps = [p]
+            options.append(steps if d <= horizon else steps[:1])
+
+        best_value = _INF
+        police_keys = self.police_keys
+        for joint in itertools.product(*options):
+            if len(set(joint)) < len(joint):
+                continue
+            next_hash = state_hash
+            for old, new in zip(police, joint):
+                next_hash ^= police_keys[old] ^ police_keys[new]
+            value, _ = self._max(thief_idx, joint, next_hash, depth - 1, alpha, beta)
+            best_value = min(best_value, value)
+            beta = min(beta, best_value)
+            if alpha >= beta:
+                break
+        if best_value == _INF:
+            # 所有联合移动都有冲突时按警察原地不动估值
+            best_value, _ = self._max(thief_idx, police, state_hash, depth - 1, alpha, beta)
+        return best_value
+
+def alpha_beta_thief_move(thief_pos, police_positions, game_map, time_budget=None, depth=THIEF_SEARCH_DEPTH):
+    """
+    小偷的深度受限博弈搜索（见 ThiefSearch），迭代加深到 depth 个小偷回合
+    :param time_budget: 每步的时间预算（秒），超时返回最后一个完整深度的结果；None 表示不限时，结果可复现
+    """
+    deadline = time.perf_counter() + time_budget if time_budget else None
+    size = game_map.size
+    search = ThiefSearch(game_map, deadline)
+    move = search.best_move(thief_pos[0] * size + thief_pos[1],
+                            [r * size + c for _, (r, c) in police_positions], depth)
+    if move is None:
+        # 连第一层都没搜完，退回一步真实距离评估
+        return path_thief_move(thief_pos, police_positions, game_map)
+    return divmod(move, size)
+
+THIEF_ALGORITHMS = {
+    "Maximin": move_thief,
+    "PathMaximin": path_thief_move,
+    "AlphaBeta": alpha_beta_thief_move,
+}